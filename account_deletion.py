@@ -0,0 +1,149 @@
+"""
+Eliminación de cuentas de usuario.
+
+Las claves foráneas hacia `users` y `projects` tienen ON DELETE CASCADE (o SET
+NULL en `documents.project_id`) y las relaciones usan `passive_deletes`, así
+que borrar un usuario es un único DELETE que resuelve la base de datos sin
+cargar hijos en la sesión.
+
+Para cuentas con más de LARGE_ACCOUNT_ROWS filas dependientes ese DELETE
+sería una transacción enorme dentro de la petición. En ese caso se borra en
+segundo plano por lotes de USER_DELETE_BATCH_SIZE filas, con un commit por
+lote, como trabajo `delete_user` del ejecutor de jobs.py. El progreso se
+guarda en `user_deletions` para el panel de admin.
+"""
+import os
+import time
+
+from sqlalchemy import delete, func, select
+
+from identity_cache import invalidate_identity
+from jobs import enqueue, job_handler
+from models import db, User, Task, Project, SupportTicket, Document, UserDeletion
+from stats import invalidate_admin_stats
+
+LARGE_ACCOUNT_ROWS = int(os.environ.get('LARGE_ACCOUNT_ROWS', '5000'))
+USER_DELETE_BATCH_SIZE = int(os.environ.get('USER_DELETE_BATCH_SIZE', '1000'))
+USER_DELETE_PAUSE = float(os.environ.get('USER_DELETE_PAUSE', '0.05'))
+
+
+def _dependent_sets(user_id):
+    """(modelo, condición) de las filas que cuelgan del usuario, de hojas a raíz."""
+    own_projects = select(Project.id).where(Project.client_id == user_id)
+    return [
+        (Task, Task.project_id.in_(own_projects)),
+        (Task, Task.assigned_to == user_id),
+        (Document, Document.client_id == user_id),
+        (SupportTicket, SupportTicket.client_id == user_id),
+        (Project, Project.client_id == user_id),
+    ]
+
+
+def dependent_row_count(user_id):
+    """Número de filas que arrastra el borrado del usuario, en una sola consulta."""
+    counts = [
+        select(func.count(model.id)).where(condition).scalar_subquery()
+        for model, condition in _dependent_sets(user_id)
+    ]
+    return db.session.execute(select(sum(counts[1:], counts[0]))).scalar() or 0
+
+
+def delete_user_now(user):
+    """Borrado directo: un DELETE y la base de datos aplica las cascadas."""
+    db.session.delete(user)
+    db.session.commit()
+
+
+def schedule_user_deletion(user, total_rows, created_by=None):
+    """Registra la eliminación y encola el trabajo que la ejecuta."""
+    deletion = db.session.get(UserDeletion, user.id)
+    if deletion is None:
+        deletion = UserDeletion(user_id=user.id, username=user.username)
+        db.session.add(deletion)
+    deletion.status = 'pendiente'
+    deletion.total_rows = total_rows
+    deletion.deleted_rows = 0
+    deletion.error = None
+    # La cuenta deja de poder iniciar sesión mientras se borra, y sus sesiones
+    # abiertas también: load_identity rechaza usuarios con una eliminación en curso
+    user.password_hash = '!'
+    job = enqueue('delete_user', {'user_id': user.id}, created_by=created_by)
+    invalidate_identity(user.id)
+    return job
+
+
+@job_handler('delete_user')
+def _delete_user_job(ctx):
+    """
+    Trabajo `delete_user`. Corre en el proceso de trabajos, así que
+    `invalidate_admin_stats()` solo vacía la caché de ese proceso: los workers
+    web muestran los recuentos anteriores hasta que caduca su copia (STATS_TTL,
+    30 s por defecto).
+    """
+    user_id = ctx.payload['user_id']
+    try:
+        deletion = delete_user_in_batches(user_id, on_progress=ctx.progress)
+    except Exception as e:
+        db.session.rollback()
+        deletion = db.session.get(UserDeletion, user_id)
+        if deletion is not None:
+            deletion.status = 'error'
+            deletion.error = str(e)[:500]
+            db.session.commit()
+        raise
+    invalidate_admin_stats()
+    return {'user_id': user_id, 'deleted_rows': deletion.deleted_rows}
+
+
+def delete_user_in_batches(user_id, batch_size=USER_DELETE_BATCH_SIZE, pause=USER_DELETE_PAUSE,
+                           on_progress=None):
+    """
+    Borra los datos del usuario por lotes acotados, un commit por lote, y por
+    último la fila del usuario. Puede reanudarse: cada lote parte de lo que queda.
+    """
+    deletion = db.session.get(UserDeletion, user_id)
+    deletion.status = 'en_proceso'
+    deletion.error = None
+    db.session.commit()
+
+    for model, condition in _dependent_sets(user_id):
+        while True:
+            batch = select(model.id).where(condition).limit(batch_size)
+            deleted = db.session.execute(
+                delete(model).where(model.id.in_(batch)).execution_options(synchronize_session=False)
+            ).rowcount
+            if not deleted:
+                break
+            deletion.deleted_rows = (deletion.deleted_rows or 0) + deleted
+            db.session.commit()
+            if on_progress is not None:
+                on_progress(deletion.deleted_rows, deletion.total_rows)
+            if pause:
+                time.sleep(pause)
+
+    # Lo que se haya creado entretanto lo resuelve la cascada de la base de datos
+    db.session.execute(delete(User).where(User.id == user_id))
+    deletion.status = 'completada'
+    db.session.commit()
+    return deletion
+
+
+def deletion_progress(limit=20):
+    """Eliminaciones recientes para el panel de administración."""
+    deletions = (
+        UserDeletion.query
+        .order_by(UserDeletion.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [{
+        'user_id': d.user_id,
+        'username': d.username,
+        'status': d.status,
+        'total_rows': d.total_rows or 0,
+        'deleted_rows': d.deleted_rows or 0,
+        'progress': 100 if d.status == 'completada' or not d.total_rows
+                    else min(99, round((d.deleted_rows or 0) * 100 / d.total_rows)),
+        'error': d.error,
+        'updated_at': d.updated_at.strftime('%Y-%m-%d %H:%M:%S') if d.updated_at else None,
+    } for d in deletions]
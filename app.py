@@ -1,18 +1,38 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
-import base64
+import hashlib
 from functools import wraps
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, session
+import click
+from flask import Flask, abort, render_template, redirect, url_for, flash, request, jsonify, session, Response, stream_with_context
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_wtf.csrf import CSRFProtect
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from email_validator import validate_email, EmailNotValidError
-from werkzeug.security import generate_password_hash, check_password_hash
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from models import db, User, Task, Project, SupportTicket, Document
+from models import db, User, Task, Project, SupportTicket, Document, Job
+from crypto_keys import get_keyring
+from stats import EMPTY_STATS, get_admin_stats, invalidate_admin_stats
+from search import search_users
+from pagination import InvalidCursor, paginate
+from dashboard_data import client_dashboard_data, employee_dashboard_data, invalidate_client_snapshot
+from conditional import conditional_response, make_etag, watermark
+from exports import EXPORTS, FORMATS, export_stream
+from task_updates import BatchError, apply_task_statuses, parse_changes
+from user_import import ImportFormatError, import_users
+from jobs import enqueue, job_status
+import reencrypt  # registra el trabajo reencrypt_notes
+from account_deletion import (
+    LARGE_ACCOUNT_ROWS, delete_user_now, deletion_progress, dependent_row_count, schedule_user_deletion,
+)
+from passwords import HashingBusy, hasher
+from identity_cache import invalidate_identity, load_identity
+from server_config import disable_statement_timeout, engine_options
+from assets import init_assets, serve_asset
+from compression import init_compression
+from template_cache import init_template_cache
+from instrumentation import init_instrumentation, timed_crypto
+import metrics
+from ratelimit_storage import default_storage_uri  # registra el esquema sqlite:// en limits
 
 # Inicialización de la aplicación Flask
 app = Flask(__name__)
@@ -24,29 +44,23 @@ app.secret_key = SECRET_KEY
 SECURE_SALT = os.environ.get('SECURITY_SALT', 'secure_salt_123').encode()
 
 def get_cipher():
-    """Genera un objeto Fernet basado en la SECRET_KEY."""
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=SECURE_SALT,
-        iterations=100000,
-    )
-    key = base64.urlsafe_b64encode(kdf.derive(SECRET_KEY.encode()))
-    return Fernet(key)
+    """Devuelve el MultiFernet del proceso (clave derivada una sola vez)."""
+    return get_keyring(SECRET_KEY, SECURE_SALT).cipher
 
 def encrypt_data(data):
     """Cifra una cadena de texto."""
     if not data: return None
-    f = get_cipher()
-    return f.encrypt(data.encode()).decode()
+    with timed_crypto():
+        return get_keyring(SECRET_KEY, SECURE_SALT).encrypt(data)
 
 def decrypt_data(encrypted_data):
     """Descifra una cadena de texto."""
     if not encrypted_data: return None
     try:
-        f = get_cipher()
-        return f.decrypt(encrypted_data.encode()).decode()
+        with timed_crypto():
+            return get_keyring(SECRET_KEY, SECURE_SALT).decrypt(encrypted_data)
     except Exception:
+        app.logger.warning("No se pudo descifrar un dato: ¿falta la clave anterior en OLD_SECRET_KEYS/OLD_SECURITY_SALTS?")
         return "Error al descifrar datos"
 
 # Configuración de la base de datos
@@ -57,21 +71,62 @@ db_uri = os.environ.get(
 )
 app.config['SQLALCHEMY_DATABASE_URI'] = db_uri
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Inicialización de extensiones
-db.init_app(app)
-csrf = CSRFProtect(app)
+# Pool dimensionado a los hilos de cada worker (ver server_config.py)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(db_uri)
+if not db_uri.startswith('sqlite'):
+    # Mide la espera de checkout del pool para /metrics
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']['poolclass'] = metrics.InstrumentedQueuePool
+
+# RATELIMIT_ENABLED=0 desactiva el limitador (solo para benchmarks en local)
+app.config['RATELIMIT_ENABLED'] = os.environ.get('RATELIMIT_ENABLED', '1') != '0'
+
+# Extensiones (se vinculan a la aplicación en create_app)
+csrf = CSRFProtect()
+# Contadores compartidos por todos los workers del host (SQLite en /dev/shm);
+# RATELIMIT_STORAGE_URI permite usar un backend de red (p. ej. redis://)
 limiter = Limiter(
     key_func=get_remote_address,
-    app=app,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://",
+    storage_uri=os.environ.get('RATELIMIT_STORAGE_URI') or default_storage_uri(),
+    strategy=os.environ.get('RATELIMIT_STRATEGY', 'sliding-window-counter'),
 )
 
 login_manager = LoginManager()
 login_manager.login_view = 'login'
 login_manager.session_protection = "strong"  # Mitigación de Session Hijacking
-login_manager.init_app(app)
+
+
+def _reset_engines_after_fork():
+    """Descarta las conexiones heredadas del proceso maestro (gunicorn --preload)."""
+    if 'sqlalchemy' not in app.extensions:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def create_app(config=None):
+    """
+    Configura la aplicación e inicializa las extensiones sin tocar la base de datos.
+    Es seguro con `gunicorn --preload`: los pools de conexiones se vacían en cada
+    worker tras el fork y las conexiones se abren bajo demanda.
+    """
+    if config:
+        app.config.update(config)
+    if 'sqlalchemy' not in app.extensions:
+        db.init_app(app)
+        csrf.init_app(app)
+        limiter.init_app(app)
+        login_manager.init_app(app)
+        init_instrumentation(app)
+        metrics.init_metrics(app, db)
+        init_assets(app)
+        init_template_cache(app)
+        # Registrado el último para ejecutarse el primero: las métricas incluyen la compresión
+        init_compression(app)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_reset_engines_after_fork)
+    return app
 
 def role_required(role):
     """Decorador para restringir acceso por rol."""
@@ -88,8 +143,8 @@ def role_required(role):
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Carga un usuario desde la base de datos por su ID."""
-    return db.session.get(User, int(user_id))
+    """Carga la identidad ligera del usuario (cacheada por worker)."""
+    return load_identity(user_id)
 
 
 @app.route('/')
@@ -113,14 +168,29 @@ def login():
         password = request.form['password']
         user = User.query.filter_by(username=username).first()
         
-        if user and check_password_hash(user.password_hash, password):
+        try:
+            valid = user is not None and hasher.verify(user.password_hash, password)
+        except HashingBusy:
+            metrics.LOGIN_ATTEMPTS.labels(result='busy').inc()
+            flash('El servidor está ocupado. Por favor intenta de nuevo en unos segundos.', 'error')
+            return render_template('login.html'), 503
+        
+        if valid:
+            metrics.LOGIN_ATTEMPTS.labels(result='success').inc()
             # Mitigación de Session Fixation
             session.clear()
             login_user(user)
             user.last_login = datetime.utcnow()
+            # Actualización transparente del hash si usa parámetros antiguos
+            if hasher.needs_rehash(user.password_hash):
+                try:
+                    user.password_hash = hasher.hash(password)
+                except HashingBusy:
+                    pass
             db.session.commit()
             return redirect(url_for('home'))
         else:
+            metrics.LOGIN_ATTEMPTS.labels(result='failure').inc()
             flash('Usuario o contraseña incorrectos', 'error')
     return render_template('login.html')
 
@@ -135,66 +205,49 @@ def logout():
 
 #  RUTAS DE ADMINISTRADOR 
 
+ADMIN_USERS_LIMIT = int(os.environ.get('ADMIN_USERS_LIMIT', '100'))
+
 @app.route('/admin')
 @login_required
 @role_required('admin')
 def admin_dashboard():
     """Dashboard para administradores con estadísticas."""
     
-    # Obtener todos los usuarios
-    users = User.query.all()
+    # Usuarios más recientes; "Cargar más" sigue con el cursor de la búsqueda
+    users, users_next_cursor = search_users(limit=ADMIN_USERS_LIMIT)
     
-    # Estadísticas con manejo de errores
+    # Estadísticas agregadas y cacheadas con manejo de errores
     try:
-        total_users = User.query.count()
-        total_admins = User.query.filter_by(role='admin').count()
-        total_employees = User.query.filter_by(role='empleado').count()
-        total_clients = User.query.filter_by(role='cliente').count()
-        total_tasks = Task.query.count()
-        total_projects = Project.query.count()
-        total_tickets = SupportTicket.query.filter(SupportTicket.status != 'resuelto').count()
-        active_tasks = Task.query.filter(Task.status != 'completada').count()
+        stats = get_admin_stats()
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f"Error al calcular estadísticas de admin: {str(e)}")
-        total_users = total_admins = total_employees = total_clients = total_tasks = total_projects = total_tickets = active_tasks = 0
+        stats = EMPTY_STATS
     
     return render_template('dashboard_admin.html', 
                          users=users,
-                         total_users=total_users,
-                         total_admins=total_admins,
-                         total_employees=total_employees,
-                         total_clients=total_clients,
-                         total_tasks=active_tasks,
-                         total_projects=total_projects,
-                         total_tickets=total_tickets)
+                         users_next_cursor=users_next_cursor,
+                         total_users=stats['total_users'],
+                         total_admins=stats['total_admins'],
+                         total_employees=stats['total_employees'],
+                         total_clients=stats['total_clients'],
+                         total_tasks=stats['active_tasks'],
+                         total_projects=stats['total_projects'],
+                         total_tickets=stats['total_tickets'])
 
 
 @app.route('/admin/search', methods=['GET'])
 @login_required
 @role_required('admin')
 def admin_search():
-    """Búsqueda de usuarios para administrador."""
+    """Búsqueda de usuarios para administrador (indexada y paginada)."""
     
-    query = request.args.get('q', '').strip()
-    role_filter = request.args.get('role', '')
-    
-    if not query and not role_filter:
-        users = User.query.all()
-    else:
-        users_query = User.query
-        
-        if query:
-            users_query = users_query.filter(
-                db.or_(
-                    User.username.ilike(f'%{query}%'),
-                    User.email.ilike(f'%{query}%')
-                )
-            )
-        
-        if role_filter:
-            users_query = users_query.filter_by(role=role_filter)
-        
-        users = users_query.all()
+    users, next_cursor = search_users(
+        query=request.args.get('q', ''),
+        role=request.args.get('role', ''),
+        cursor=request.args.get('cursor'),
+        limit=request.args.get('limit'),
+    )
     
     users_data = [{
         'id': u.id,
@@ -204,7 +257,25 @@ def admin_search():
         'created_at': u.created_at.strftime('%Y-%m-%d') if u.created_at else ''
     } for u in users]
     
-    return jsonify(users_data)
+    return jsonify({'users': users_data, 'next_cursor': next_cursor})
+
+
+@app.route('/admin/export/<resource>', methods=['GET'])
+@login_required
+@role_required('admin')
+@limiter.limit("5 per minute")
+def admin_export(resource):
+    """Exporta usuarios, tareas o tickets en streaming (?format=ndjson|csv)."""
+    fmt = request.args.get('format', 'ndjson')
+    if resource not in EXPORTS or fmt not in FORMATS:
+        return jsonify({'error': 'Exportación no válida'}), 404
+    
+    rows, content_type = export_stream(resource, fmt)
+    filename = f"{resource}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return Response(stream_with_context(rows), content_type=content_type, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+    })
 
 
 @app.route('/admin/create_user', methods=['POST'])
@@ -231,14 +302,47 @@ def create_user():
     if existing_user:
         flash('El nombre de usuario ya existe', 'error')
     else:
-        new_user = User(username=username, password_hash=generate_password_hash(password), role=role, email=email)
+        try:
+            password_hash = hasher.hash(password)
+        except HashingBusy:
+            flash('El servidor está ocupado. Por favor intenta de nuevo en unos segundos.', 'error')
+            return redirect(url_for('admin_dashboard'))
+        new_user = User(username=username, password_hash=password_hash, role=role, email=email)
         db.session.add(new_user)
         db.session.commit()
+        invalidate_admin_stats()
         flash('Usuario creado exitosamente', 'success')
         
     return redirect(url_for('admin_dashboard'))
 
 
+@app.route('/admin/import_users', methods=['POST'])
+@login_required
+@role_required('admin')
+@limiter.limit("2 per minute")
+def admin_import_users():
+    """Alta masiva de usuarios desde un fichero CSV, NDJSON o JSON (campo `file`)."""
+    
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'No se recibió ningún fichero'}), 400
+    
+    try:
+        report = import_users(upload.stream, upload.filename)
+    except ImportFormatError as e:
+        # Un error a mitad de fichero puede llegar con lotes ya confirmados
+        invalidate_admin_stats()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error en importación masiva de usuarios: {str(e)}")
+        return jsonify({'error': 'La importación se interrumpió; los lotes ya confirmados se conservan'}), 500
+    
+    if report.created:
+        invalidate_admin_stats()
+    return jsonify(report.as_dict())
+
+
 @app.route('/admin/edit_user/<int:user_id>', methods=['POST'])
 @login_required
 @role_required('admin')
@@ -273,12 +377,18 @@ def edit_user(user_id):
     if role:
         user.role = role
     if password:
-        user.password_hash = generate_password_hash(password)
+        try:
+            user.password_hash = hasher.hash(password)
+        except HashingBusy:
+            flash('El servidor está ocupado. Por favor intenta de nuevo en unos segundos.', 'error')
+            return redirect(url_for('admin_dashboard'))
     
     # Permitir borrar el email si viene vacío
     user.email = email if email else None
         
     db.session.commit()
+    invalidate_admin_stats()
+    invalidate_identity(user.id)
     flash('Usuario actualizado correctamente', 'success')
     return redirect(url_for('admin_dashboard'))
 
@@ -301,9 +411,17 @@ def delete_user(user_id):
     
     try:
         username_to_delete = user.username
-        db.session.delete(user)
-        db.session.commit()
-        flash(f'Usuario {username_to_delete} y todos sus datos relacionados eliminados correctamente', 'success')
+        total_rows = dependent_row_count(user_id)
+        if total_rows >= LARGE_ACCOUNT_ROWS:
+            schedule_user_deletion(user, total_rows, created_by=current_user.id)
+            flash(f'Usuario {username_to_delete} tiene {total_rows} registros asociados: '
+                  'se eliminará en segundo plano', 'success')
+        else:
+            delete_user_now(user)
+            invalidate_admin_stats()
+            flash(f'Usuario {username_to_delete} y todos sus datos relacionados eliminados correctamente', 'success')
+        invalidate_identity(user_id)
+        invalidate_client_snapshot(user_id)
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error al eliminar usuario {user_id}: {str(e)}")
@@ -312,6 +430,49 @@ def delete_user(user_id):
     return redirect(url_for('admin_dashboard'))
 
 
+@app.route('/admin/deletions', methods=['GET'])
+@login_required
+@role_required('admin')
+def admin_deletions():
+    """Progreso de las eliminaciones de usuarios en segundo plano."""
+    return jsonify({'deletions': deletion_progress()})
+
+
+@app.route('/admin/jobs', methods=['GET'])
+@login_required
+@role_required('admin')
+def admin_jobs():
+    """Trabajos en segundo plano más recientes (?status= para filtrar)."""
+    query = db.select(Job).order_by(Job.id.desc()).limit(50)
+    if request.args.get('status'):
+        query = query.where(Job.status == request.args['status'])
+    return jsonify({'jobs': [job_status(job) for job in db.session.execute(query).scalars()]})
+
+
+@app.route('/admin/reencrypt', methods=['POST'])
+@login_required
+@role_required('admin')
+@limiter.limit("2 per minute")
+def admin_reencrypt():
+    """Encola el re-cifrado de las notas con la clave actual (uno a la vez)."""
+    running = db.session.execute(
+        db.select(Job).where(Job.kind == 'reencrypt_notes', Job.status.in_(('pendiente', 'en_proceso')))
+    ).scalars().first()
+    job = running or enqueue('reencrypt_notes', created_by=current_user.id)
+    return jsonify(job_status(job)), 200 if running else 202
+
+
+@app.route('/admin/jobs/<int:job_id>', methods=['GET'])
+@login_required
+@role_required('admin')
+def admin_job(job_id):
+    """Estado de un trabajo en segundo plano."""
+    job = db.session.get(Job, job_id)
+    if not job:
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify(job_status(job))
+
+
 # RUTAS DE EMPLEADO 
 
 @app.route('/employee')
@@ -320,28 +481,15 @@ def delete_user(user_id):
 def employee_dashboard():
     """Dashboard para empleados."""
     
-    # Tareas del empleado
-    my_tasks = Task.query.filter_by(assigned_to=current_user.id).all()
-    
-    # Estadísticas de tareas con manejo de errores
     try:
-        pending_tasks = Task.query.filter_by(assigned_to=current_user.id, status='pendiente').count()
-        in_progress_tasks = Task.query.filter_by(assigned_to=current_user.id, status='en_proceso').count()
-        completed_tasks = Task.query.filter_by(assigned_to=current_user.id, status='completada').count()
-        
-        
-        my_projects = Project.query.join(Task).filter(Task.assigned_to == current_user.id).distinct().all()
+        data = employee_dashboard_data(current_user.id)
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f"Error al cargar datos de empleado: {str(e)}")
-        pending_tasks = in_progress_tasks = completed_tasks = 0
-        my_projects = []
+        data = {'my_tasks': [], 'my_projects': [], 'pending_tasks': 0, 'in_progress_tasks': 0,
+                'completed_tasks': 0, 'total_tasks': 0, 'completion_rate': 0}
     
-    return render_template('dashboard_employee.html',
-                         my_tasks=my_tasks,
-                         pending_tasks=pending_tasks,
-                         in_progress_tasks=in_progress_tasks,
-                         completed_tasks=completed_tasks,
-                         my_projects=my_projects)
+    return render_template('dashboard_employee.html', **data)
 
 
 @app.route('/employee/tasks')
@@ -353,23 +501,30 @@ def employee_tasks():
     status_filter = request.args.get('status', '')
     priority_filter = request.args.get('priority', '')
     
-    tasks_query = Task.query.filter_by(assigned_to=current_user.id)
+    tasks_query = db.select(
+        Task.id, Task.title, Task.description, Task.status, Task.priority, Task.due_date
+    ).where(Task.assigned_to == current_user.id)
     
     if status_filter:
-        tasks_query = tasks_query.filter_by(status=status_filter)
+        tasks_query = tasks_query.where(Task.status == status_filter)
     if priority_filter:
-        tasks_query = tasks_query.filter_by(priority=priority_filter)
+        tasks_query = tasks_query.where(Task.priority == priority_filter)
     
-    tasks = tasks_query.order_by(Task.due_date.asc()).all()
+    etag = make_etag(current_user.id, *watermark(tasks_query, Task.id, Task.updated_at, Task.created_at))
     
-    return jsonify([{
-        'id': t.id,
-        'title': t.title,
-        'description': t.description,
-        'status': t.status,
-        'priority': t.priority,
-        'due_date': t.due_date.strftime('%Y-%m-%d') if t.due_date else None
-    } for t in tasks])
+    def build():
+        tasks, next_cursor = paginate(db.session, tasks_query, Task.id, sort_col=Task.due_date,
+                                      cursor=request.args.get('cursor'), limit=request.args.get('limit'))
+        return jsonify({'tasks': [{
+            'id': t.id,
+            'title': t.title,
+            'description': t.description,
+            'status': t.status,
+            'priority': t.priority,
+            'due_date': t.due_date.strftime('%Y-%m-%d') if t.due_date else None
+        } for t in tasks], 'next_cursor': next_cursor})
+    
+    return conditional_response(etag, build)
 
 
 @app.route('/employee/update_task/<int:task_id>', methods=['POST'])
@@ -391,11 +546,35 @@ def employee_update_task(task_id):
         if new_status == 'completada':
             task.completed_at = datetime.utcnow()
         db.session.commit()
+        invalidate_admin_stats()
         return jsonify({'success': True, 'message': 'Tarea actualizada'})
     
     return jsonify({'error': 'Estado no válido'}), 400
 
 
+@app.route('/employee/update_tasks', methods=['POST'])
+@login_required
+@role_required('empleado')
+def employee_update_tasks():
+    """Actualiza el estado de varias tareas en un solo commit (JSON con token en X-CSRFToken)."""
+    
+    try:
+        changes = parse_changes(request.get_json(silent=True))
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        results, updated = apply_task_statuses(current_user.id, changes)
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error en actualización por lotes de tareas: {str(e)}")
+        return jsonify({'error': 'No se pudieron actualizar las tareas'}), 500
+    
+    if updated:
+        invalidate_admin_stats()
+    return jsonify({'updated': updated, 'results': results})
+
+
 #  RUTAS DE CLIENTE 
 
 @app.route('/client')
@@ -403,32 +582,29 @@ def employee_update_task(task_id):
 @role_required('cliente')
 def client_dashboard():
     """Dashboard para clientes."""
-    
-    # Proyectos del cliente
-    my_projects = Project.query.filter_by(client_id=current_user.id).all()
-    
-    # Tickets del cliente
-    my_tickets = SupportTicket.query.filter_by(client_id=current_user.id).order_by(SupportTicket.created_at.desc()).limit(5).all()
-    
-    # Estadísticas para el dashboard
-    active_projects = Project.query.filter_by(client_id=current_user.id, status='activo').count()
-    completed_projects = Project.query.filter_by(client_id=current_user.id, status='completado').count()
-    open_tickets = SupportTicket.query.filter_by(client_id=current_user.id, status='abierto').count()
-    
-    # Documentos del cliente
-    my_documents = Document.query.filter_by(client_id=current_user.id).all()
-    
+    # Una escritura reciente pudo atenderla otro worker: su caché local no se invalidó
+    refresh = session.pop('client_snapshot_stale', False)
+    try:
+        data = dict(client_dashboard_data(
+            current_user.id, docs_cursor=request.args.get('docs_cursor'), refresh=refresh
+        ))
+    except InvalidCursor:
+        abort(400)
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error al cargar datos de cliente: {str(e)}")
+        data = {'my_projects': [], 'my_tickets': [], 'my_documents': [], 'documents_next_cursor': None,
+                'active_projects': 0, 'completed_projects': 0, 'open_tickets': 0, 'encrypted_note': None}
+
     # Nota privada descifrada (Segura, solo se descifra para la vista del dueño)
-    decrypted_note = decrypt_data(current_user.encrypted_note) or ""
-    
-    return render_template('dashboard_client.html',
-                         my_projects=my_projects,
-                         my_tickets=my_tickets,
-                         my_documents=my_documents,
-                         decrypted_note=decrypted_note,
-                         active_projects=active_projects,
-                         completed_projects=completed_projects,
-                         open_tickets=open_tickets)
+    data['decrypted_note'] = decrypt_data(data.pop('encrypted_note')) or ""
+    return render_template('dashboard_client.html', **data)
+
+
+def _client_data_changed(client_id):
+    """Invalidación write-through del snapshot del cliente (este worker y, vía sesión, el siguiente)."""
+    invalidate_client_snapshot(client_id)
+    session['client_snapshot_stale'] = True
 
 
 @app.route('/client/create_ticket', methods=['POST'])
@@ -450,6 +626,8 @@ def client_create_ticket():
     )
     db.session.add(new_ticket)
     db.session.commit()
+    invalidate_admin_stats()
+    _client_data_changed(current_user.id)
     
     flash('Ticket creado exitosamente', 'success')
     return redirect(url_for('client_dashboard'))
@@ -461,16 +639,25 @@ def client_create_ticket():
 def client_projects():
     """Ver todos los proyectos del cliente."""
     
-    projects = Project.query.filter_by(client_id=current_user.id).all()
+    projects_query = db.select(
+        Project.id, Project.name, Project.description, Project.status, Project.progress, Project.deadline
+    ).where(Project.client_id == current_user.id)
+    
+    etag = make_etag(current_user.id, *watermark(projects_query, Project.id, Project.updated_at, Project.created_at))
+    
+    def build():
+        projects, next_cursor = paginate(db.session, projects_query, Project.id,
+                                         cursor=request.args.get('cursor'), limit=request.args.get('limit'))
+        return jsonify({'projects': [{
+            'id': p.id,
+            'name': p.name,
+            'description': p.description,
+            'status': p.status,
+            'progress': p.progress,
+            'deadline': p.deadline.strftime('%Y-%m-%d') if p.deadline else None
+        } for p in projects], 'next_cursor': next_cursor})
     
-    return jsonify([{
-        'id': p.id,
-        'name': p.name,
-        'description': p.description,
-        'status': p.status,
-        'progress': p.progress,
-        'deadline': p.deadline.strftime('%Y-%m-%d') if p.deadline else None
-    } for p in projects])
+    return conditional_response(etag, build)
 
 
 @app.route('/client/my_tickets')
@@ -479,16 +666,29 @@ def client_projects():
 def client_tickets():
     """Ver todos los tickets del cliente."""
     
-    tickets = SupportTicket.query.filter_by(client_id=current_user.id).order_by(SupportTicket.created_at.desc()).all()
+    tickets_query = db.select(
+        SupportTicket.id, SupportTicket.subject, SupportTicket.message,
+        SupportTicket.status, SupportTicket.priority, SupportTicket.created_at
+    ).where(SupportTicket.client_id == current_user.id)
     
-    return jsonify([{
-        'id': t.id,
-        'subject': t.subject,
-        'message': t.message,
-        'status': t.status,
-        'priority': t.priority,
-        'created_at': t.created_at.strftime('%Y-%m-%d %H:%M')
-    } for t in tickets])
+    etag = make_etag(current_user.id, *watermark(
+        tickets_query, SupportTicket.id, SupportTicket.updated_at, SupportTicket.created_at
+    ))
+    
+    def build():
+        tickets, next_cursor = paginate(db.session, tickets_query, SupportTicket.id,
+                                        sort_col=SupportTicket.created_at, descending=True,
+                                        cursor=request.args.get('cursor'), limit=request.args.get('limit'))
+        return jsonify({'tickets': [{
+            'id': t.id,
+            'subject': t.subject,
+            'message': t.message,
+            'status': t.status,
+            'priority': t.priority,
+            'created_at': t.created_at.strftime('%Y-%m-%d %H:%M') if t.created_at else None
+        } for t in tickets], 'next_cursor': next_cursor})
+    
+    return conditional_response(etag, build)
 
 
 
@@ -513,9 +713,14 @@ def view_document(doc_id):
 @login_required
 def get_notes():
     """Obtiene las notas privadas descifradas."""
-    return jsonify({
-        "note": decrypt_data(current_user.encrypted_note) or ""
-    })
+    # Fernet usa un IV aleatorio: cada actualización cambia el texto cifrado y por tanto la ETag
+    encrypted_note = db.session.execute(
+        db.select(User.encrypted_note).where(User.id == current_user.id)
+    ).scalar()
+    etag = make_etag(current_user.id, hashlib.sha256((encrypted_note or '').encode()).hexdigest())
+    return conditional_response(etag, lambda: jsonify({
+        "note": decrypt_data(encrypted_note) or ""
+    }))
 
 
 @app.route('/client/notes/update', methods=['POST'])
@@ -524,12 +729,30 @@ def get_notes():
 def update_notes():
     """Actualiza las notas cifrándolas en reposo."""
     note = request.form.get('note', '')
-    current_user.encrypted_note = encrypt_data(note)
+    current_user.get_entity().encrypted_note = encrypt_data(note)
     db.session.commit()
+    _client_data_changed(current_user.id)
     flash('Notas privadas actualizadas y cifradas en reposo.', 'success')
     return redirect(url_for('client_dashboard'))
 
 
+@app.route('/metrics')
+@limiter.exempt
+def prometheus_metrics():
+    """Métricas en formato Prometheus (token METRICS_TOKEN o sesión de administrador)."""
+    if not metrics.is_authorized(current_user):
+        return "No autorizado", 403
+    body, content_type = metrics.render_metrics()
+    return Response(body, content_type=content_type)
+
+
+@app.route('/assets/<path:filename>')
+@limiter.exempt
+def asset(filename):
+    """CSS/JS de los paneles con huella de contenido y caché inmutable (ver assets.py)."""
+    return serve_asset(filename)
+
+
 @app.after_request
 def add_security_headers(response):
     """Añade encabezados de seguridad a todas las respuestas."""
@@ -551,21 +774,50 @@ def forbidden_error(error):
 
 @app.errorhandler(429)
 def ratelimit_handler(e):
+    metrics.RATELIMIT_REJECTIONS.labels(endpoint=request.endpoint or 'unknown').inc()
     flash("Has excedido el límite de solicitudes. Por favor espera un momento.", "error")
     return redirect(url_for('home'))
 
+@app.errorhandler(InvalidCursor)
+def invalid_cursor_error(error):
+    # Reiniciar desde la primera página haría que un cliente que sigue next_cursor no terminase nunca
+    return jsonify({'error': str(error)}), 400
+
 @app.errorhandler(500)
 def internal_error(error):
     db.session.rollback()
     return render_template('errors/500.html'), 500
 
+@app.cli.command('bootstrap')
+def bootstrap_command():
+    """Aplica migraciones y carga datos iniciales. Ejecutar una vez antes de arrancar los workers."""
+    from init_db import init_db
+    disable_statement_timeout(db.engine)
+    init_db()
+
+
+@app.cli.group('jobs')
+def jobs_cli():
+    """Trabajos en segundo plano."""
+
+
+@jobs_cli.command('work')
+@click.option('--once', is_flag=True, help='Procesa los trabajos pendientes y termina.')
+def jobs_work_command(once):
+    """Ejecutor de trabajos dedicado, fuera de los workers web."""
+    import logging
+    from jobs import run_worker
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    # Un trabajo puede durar más que el límite de las peticiones web
+    disable_statement_timeout(db.engine)
+    run_worker(once=once)
+
+
+create_app()
+
 if __name__ == '__main__':
+    from init_db import init_db
+    from jobs import start_background_worker
+    init_db()
+    start_background_worker(app)
     app.run(host='0.0.0.0', port=8080, debug=False)
-
-    # Auto-inicializar tablas y datos al arrancar
-with app.app_context():
-    db.create_all()
-    from models import User
-    if not User.query.first():
-        from init_db import init_db
-        init_db()
@@ -0,0 +1,133 @@
+"""
+CSS y JavaScript de los paneles con huella de contenido.
+
+Los ficheros de static/css y static/js se sirven desde
+`/assets/<nombre>.<hash>.<ext>`: como la URL cambia con el contenido, la
+respuesta lleva `Cache-Control: public, max-age=31536000, immutable` y el
+navegador no los vuelve a pedir hasta que un despliegue los modifique.
+
+Al importar la aplicación (una vez en el maestro con gunicorn --preload) se
+lee cada fichero, se calcula su hash y se precomprimen las variantes gzip y
+brotli al nivel máximo; quedan en memoria y los workers las heredan. Cada
+petición solo elige la variante según Accept-Encoding. Brotli es opcional:
+sin el paquete `brotli` se ofrecen gzip y la versión sin comprimir.
+
+En las plantillas: `{{ asset_url('css/dashboard_admin.css') }}`.
+"""
+import hashlib
+import os
+import re
+
+from flask import Response, abort, current_app, request, url_for
+
+from compression import ENCODINGS, compress, negotiate_encoding
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+ASSET_DIRS = ('css', 'js')
+ASSET_MAX_AGE = 31536000
+DIGEST_LENGTH = 12
+
+CONTENT_TYPES = {
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8',
+}
+
+_DIGEST_RE = re.compile(r'^(?P<stem>.+)\.[0-9a-f]{%d}(?P<ext>\.[a-z]+)$' % DIGEST_LENGTH)
+
+
+class Asset:
+    """Un fichero estático con su hash y sus variantes precomprimidas."""
+
+    __slots__ = ('name', 'path', 'mtime', 'digest', 'url_name', 'content_type', 'variants')
+
+    def __init__(self, name, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        stem, ext = os.path.splitext(name)
+        self.name = name
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        self.digest = hashlib.sha256(data).hexdigest()[:DIGEST_LENGTH]
+        self.url_name = f'{stem}.{self.digest}{ext}'
+        self.content_type = CONTENT_TYPES[ext]
+        self.variants = {'identity': data}
+        for encoding in ENCODINGS:
+            body = compress(data, encoding, gzip_level=9, brotli_quality=11)
+            if len(body) < len(data):
+                self.variants[encoding] = body
+
+    def negotiate(self, accept_encodings):
+        """Codificación a enviar según el Accept-Encoding de la petición."""
+        available = [encoding for encoding in ENCODINGS if encoding in self.variants]
+        return negotiate_encoding(accept_encodings, available) or 'identity'
+
+
+# nombre lógico -> Asset, y nombre con hash -> Asset
+_assets = {}
+_by_url_name = {}
+
+
+def load_assets(static_dir=STATIC_DIR):
+    """Lee y precomprime todos los recursos; devuelve el número cargado."""
+    _assets.clear()
+    _by_url_name.clear()
+    for folder in ASSET_DIRS:
+        directory = os.path.join(static_dir, folder)
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            if os.path.splitext(filename)[1] in CONTENT_TYPES:
+                _register(Asset(f'{folder}/{filename}', os.path.join(directory, filename)))
+    return len(_assets)
+
+
+def _register(asset):
+    previous = _assets.get(asset.name)
+    if previous is not None:
+        _by_url_name.pop(previous.url_name, None)
+    _assets[asset.name] = asset
+    _by_url_name[asset.url_name] = asset
+
+
+def asset_url(name):
+    """URL con huella de un recurso de static/ (global de Jinja)."""
+    asset = _assets.get(name)
+    if asset is not None and current_app.debug and os.path.getmtime(asset.path) != asset.mtime:
+        # En desarrollo los cambios se ven sin reiniciar
+        asset = Asset(name, asset.path)
+        _register(asset)
+    if asset is None:
+        return url_for('static', filename=name)
+    return url_for('asset', filename=asset.url_name)
+
+
+def serve_asset(filename):
+    """Respuesta para /assets/<nombre con hash>."""
+    asset = _by_url_name.get(filename)
+    immutable = asset is not None
+    if asset is None:
+        # Hash de otro despliegue (p. ej. una página aún en caché durante el
+        # relevo de workers): se sirve la versión actual sin caché larga
+        match = _DIGEST_RE.match(filename)
+        asset = _assets.get(match.group('stem') + match.group('ext')) if match else None
+        if asset is None:
+            abort(404)
+
+    encoding = asset.negotiate(request.accept_encodings)
+    response = Response(asset.variants[encoding], content_type=asset.content_type)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(f'{asset.digest}-{encoding}')
+    if immutable:
+        response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+def init_assets(app):
+    """Carga los recursos y registra `asset_url` en Jinja."""
+    count = load_assets(os.path.join(app.root_path, 'static'))
+    app.add_template_global(asset_url)
+    app.logger.debug(f"{count} recursos estáticos cargados")
@@ -0,0 +1,249 @@
+"""
+Benchmark de carga y latencia para todas las rutas.
+
+Inicia sesión con un usuario de cada rol, lanza peticiones concurrentes contra
+las rutas de lectura y escritura y reporta p50/p95/p99, throughput y consultas
+SQL por petición. Las consultas se leen de la métrica `sql` de la cabecera
+Server-Timing, que el servidor envía a todos los roles solo con
+SERVER_TIMING_PUBLIC=1 y en las peticiones muestreadas
+(INSTRUMENTATION_SAMPLE_RATE=1). Los resultados pueden guardarse como línea
+base y compararse en ejecuciones posteriores.
+
+Las redirecciones no se siguen: cuenta como error cualquier respuesta distinta
+de 200/304 (o de la redirección que la ruta devuelve al tener éxito). Así una
+petición rechazada por el limitador (302 a /) no pasa por un éxito rápido.
+
+Ejemplo con SQLite como sustituto de PostgreSQL:
+    export SQLALCHEMY_DATABASE_URI=sqlite:////tmp/bench.db RATELIMIT_ENABLED=0
+    export INSTRUMENTATION_SAMPLE_RATE=1 SERVER_TIMING_PUBLIC=1
+    python init_db.py && python init_db.py --synthetic --users 5000 --tasks 50000
+    gunicorn --config gunicorn.conf.py app:app &
+    python benchmark.py --requests 200 --concurrency 8 --save-baseline
+    python benchmark.py --requests 200 --concurrency 8 --compare
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+BASE_URL = os.environ.get('BENCH_BASE_URL', 'http://localhost:8080')
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'baseline.json')
+
+CREDENTIALS = {
+    'admin': ('admin', 'admin123'),
+    'empleado': ('empleado1', 'emp123'),
+    'cliente': ('cliente1', 'cli123'),
+}
+
+CSRF_RE = re.compile(r"""csrf_token['"]?(?:\s*value=|,\s*)['"]([^'"]+)['"]""")
+SQL_TIMING_RE = re.compile(r'(?:^|,)\s*sql;[^,]*?desc="?(\d+)')
+
+
+class Session:
+    """Sesión autenticada de un rol con su token CSRF."""
+
+    def __init__(self, base_url, role):
+        self.base_url = base_url
+        self.role = role
+        self.http = requests.Session()
+        self.csrf = None
+
+    def login(self):
+        username, password = CREDENTIALS[self.role]
+        page = self.http.get(f'{self.base_url}/login')
+        token = CSRF_RE.search(page.text)
+        response = self.http.post(f'{self.base_url}/login', data={
+            'username': username,
+            'password': password,
+            'csrf_token': token.group(1) if token else '',
+        })
+        # Flask-Login limpia la sesión al entrar: el token válido está en el dashboard
+        token = CSRF_RE.search(response.text)
+        if response.status_code != 200 or not token:
+            raise RuntimeError(f'No se pudo iniciar sesión como {self.role} (HTTP {response.status_code})')
+        self.csrf = token.group(1)
+        return self
+
+
+def _task_ids(session):
+    data = session.http.get(f'{session.base_url}/employee/tasks?limit=50').json()
+    return [t['id'] for t in data.get('tasks', [])] or [0]
+
+
+def build_scenarios(sessions):
+    """Lista de (nombre, rol, función que ejecuta una petición[, comprobación de éxito])."""
+    admin, employee, client = sessions['admin'], sessions['empleado'], sessions['cliente']
+    task_ids = _task_ids(employee)
+
+    def get(session, path):
+        return lambda i: session.http.get(f'{session.base_url}{path}', allow_redirects=False)
+
+    def revalidate(session, path):
+        # Sondeo con ETag vigente: mide la ruta 304
+        etag = session.http.get(f'{session.base_url}{path}').headers.get('ETag', '')
+        return lambda i: session.http.get(
+            f'{session.base_url}{path}', headers={'If-None-Match': etag}, allow_redirects=False,
+        )
+
+    def post(session, path_fn, data_fn):
+        return lambda i: session.http.post(
+            f'{session.base_url}{path_fn(i)}', data={**data_fn(i), 'csrf_token': session.csrf},
+            allow_redirects=False,
+        )
+
+    # Los formularios responden con una redirección al panel
+    to_client = redirects_to('/client')
+
+    return [
+        ('GET /admin', 'admin', get(admin, '/admin')),
+        ('GET /admin/search', 'admin', get(admin, '/admin/search?q=cli')),
+        ('GET /employee', 'empleado', get(employee, '/employee')),
+        ('GET /employee/tasks', 'empleado', get(employee, '/employee/tasks')),
+        ('GET /employee/tasks (304)', 'empleado', revalidate(employee, '/employee/tasks')),
+        ('GET /client', 'cliente', get(client, '/client')),
+        ('GET /client/my_tickets', 'cliente', get(client, '/client/my_tickets')),
+        ('GET /client/my_tickets (304)', 'cliente', revalidate(client, '/client/my_tickets')),
+        ('GET /client/notes', 'cliente', get(client, '/client/notes')),
+        ('POST /employee/update_task', 'empleado', post(
+            employee,
+            lambda i: f'/employee/update_task/{task_ids[i % len(task_ids)]}',
+            lambda i: {'status': ('pendiente', 'en_proceso')[i % 2]},
+        )),
+        ('POST /client/create_ticket', 'cliente', post(
+            client, lambda i: '/client/create_ticket',
+            lambda i: {'subject': f'Benchmark {i}', 'message': 'Ticket de benchmark', 'priority': 'baja'},
+        ), to_client),
+        ('POST /client/notes/update', 'cliente', post(
+            client, lambda i: '/client/notes/update', lambda i: {'note': f'Nota de benchmark {i}'},
+        ), to_client),
+    ]
+
+
+def is_success(response):
+    """Éxito por defecto: 200 o 304."""
+    return response.status_code in (200, 304)
+
+
+def redirects_to(path):
+    """Éxito de un formulario: 302 a `path` (el limitador redirige a /)."""
+    def check(response):
+        location = response.headers.get('Location', '')
+        return response.status_code == 302 and urlsplit(location).path == path
+    return check
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_scenario(request_fn, total, concurrency, ok=is_success):
+    """Ejecuta `total` peticiones con `concurrency` hilos y agrega las métricas."""
+    def timed(i):
+        start = time.perf_counter()
+        response = request_fn(i)
+        elapsed = (time.perf_counter() - start) * 1000
+        match = SQL_TIMING_RE.search(response.headers.get('Server-Timing', ''))
+        return elapsed, ok(response), int(match.group(1)) if match else None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(total)))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(r[0] for r in results)
+    queries = [r[2] for r in results if r[2] is not None]
+    return {
+        'requests': total,
+        'errors': sum(1 for r in results if not r[1]),
+        'p50_ms': round(_percentile(latencies, 50), 2),
+        'p95_ms': round(_percentile(latencies, 95), 2),
+        'p99_ms': round(_percentile(latencies, 99), 2),
+        'throughput_rps': round(total / wall, 1) if wall else 0.0,
+        'queries_per_request': round(statistics.mean(queries), 2) if queries else None,
+    }
+
+
+def print_report(results, baseline=None):
+    header = f"{'Ruta':<30}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>9}{'SQL/req':>9}{'err':>6}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        qpr = '-' if r['queries_per_request'] is None else r['queries_per_request']
+        print(f"{name:<30}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}"
+              f"{r['throughput_rps']:>9}{qpr:>9}{r['errors']:>6}")
+        if baseline and name in baseline:
+            before = baseline[name]['p95_ms']
+            change = (r['p95_ms'] - before) / before * 100 if before else 0.0
+            print(f"{'':<30}p95 base {before} ms ({change:+.1f}%)")
+
+
+def find_regressions(results, baseline, threshold_pct):
+    """Rutas cuyo p95 empeora más de `threshold_pct` respecto a la línea base."""
+    regressions = []
+    for name, r in results.items():
+        before = baseline.get(name, {}).get('p95_ms')
+        if before and (r['p95_ms'] - before) / before * 100 > threshold_pct:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de latencia de las rutas.')
+    parser.add_argument('--url', default=BASE_URL)
+    parser.add_argument('--requests', type=int, default=100, help='Peticiones por ruta')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--only', default='', help='Filtrar rutas que contengan este texto')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=20.0, help='Regresión máxima de p95 en %%')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        # Sin línea base no hay con qué comparar: fallar en lugar de aprobar en silencio
+        if not os.path.exists(args.baseline):
+            sys.exit(f"✗ No existe la línea base {args.baseline}; genérala con --save-baseline")
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    sessions = {role: Session(args.url, role).login() for role in CREDENTIALS}
+    results = {}
+    for name, role, request_fn, *ok in build_scenarios(sessions):
+        if args.only and args.only not in name:
+            continue
+        results[name] = run_scenario(request_fn, args.requests, args.concurrency, *ok)
+
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+                'results': results,
+            }, f, indent=2)
+        print(f"\n✓ Línea base guardada en {args.baseline}")
+
+    if baseline is not None:
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ Regresiones de p95 > {args.threshold}%: {', '.join(regressions)}")
+            sys.exit(1)
+        print('\n✓ Sin regresiones respecto a la línea base')
+
+
+if __name__ == '__main__':
+    main()
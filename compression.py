@@ -0,0 +1,89 @@
+"""
+Compresión negociada de las respuestas HTML y JSON.
+
+Un hook `after_request` comprime con brotli o gzip (según Accept-Encoding)
+las respuestas de COMPRESSIBLE_TYPES que superan COMPRESS_MIN_SIZE bytes. No
+se tocan:
+
+- las respuestas en streaming (exportaciones) ni las de fichero, cuyo cuerpo
+  no está en memoria;
+- las que ya llevan Content-Encoding (recursos precomprimidos de assets.py);
+- 204, 304 y respuestas sin cuerpo.
+
+Los niveles son moderados porque se comprime en cada petición; los recursos
+estáticos, que se comprimen una sola vez, usan el máximo.
+
+Una respuesta comprimida lleva su ETag como débil (`W/"..."`): el cuerpo ya no
+es byte a byte el de la ETag fuerte, pero sigue sirviendo para revalidar con
+If-None-Match, que usa comparación débil.
+"""
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '4'))
+
+COMPRESSIBLE_TYPES = ('text/html', 'application/json')
+# Preferencia del servidor cuando el cliente acepta varias codificaciones
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encodings, available=ENCODINGS):
+    """Primera codificación de `available` que acepta el cliente, o None."""
+    for encoding in available:
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress(data, encoding, gzip_level=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality, mode=brotli.MODE_TEXT)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def _compressible(response):
+    return not (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_TYPES
+    )
+
+
+def compress_response(response):
+    """Comprime la respuesta si procede; si no, la devuelve intacta."""
+    if not _compressible(response):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    # La respuesta depende de Accept-Encoding aunque esta vez no se comprima
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    body = compress(data, encoding)
+    if len(body) >= len(data):
+        return response
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Registra el hook de compresión."""
+    app.after_request(compress_response)
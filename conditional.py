@@ -0,0 +1,53 @@
+"""
+Peticiones condicionales (ETag / If-None-Match) para los endpoints JSON de lectura.
+
+La versión de una respuesta se calcula con una consulta agregada barata sobre
+las mismas condiciones que la lista (número de filas, id máximo y marca de
+tiempo máxima de `updated_at`/`created_at`), sin leer ni serializar las filas.
+Un alta aumenta el id máximo, una baja reduce el recuento y una modificación
+avanza la marca de tiempo, así que cualquier cambio produce una ETag nueva.
+
+Si el cliente envía una ETag vigente en `If-None-Match` se responde `304` sin
+ejecutar la consulta de datos.
+"""
+import hashlib
+import json
+
+from flask import Response, request
+from sqlalchemy import func
+
+from models import db
+
+
+def watermark(stmt, id_col, *timestamp_cols):
+    """(recuento, id máximo, marca de tiempo máxima) de las filas que selecciona `stmt`."""
+    changed_at = func.coalesce(*timestamp_cols) if len(timestamp_cols) > 1 else timestamp_cols[0]
+    row = db.session.execute(
+        stmt.with_only_columns(func.count(id_col), func.max(id_col), func.max(changed_at))
+        .order_by(None)
+    ).one()
+    return tuple(row)
+
+
+def make_etag(*parts):
+    """ETag fuerte a partir de la versión de los datos, el endpoint y sus parámetros."""
+    payload = json.dumps(
+        [request.endpoint, sorted(request.args.items(multi=True)), *parts],
+        default=str, separators=(',', ':'),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def conditional_response(etag, build):
+    """
+    Devuelve 304 si `If-None-Match` contiene `etag`; si no, la respuesta de
+    `build()` con la ETag. `Cache-Control: no-cache` obliga a revalidar siempre.
+    """
+    # Comparación débil: las respuestas comprimidas llevan la ETag como W/"..."
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = build()
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,148 @@
+"""
+Anillo de claves Fernet para el cifrado de datos en reposo.
+
+La derivación PBKDF2 se ejecuta una sola vez por proceso y por clave; el
+resultado se guarda en un MultiFernet que cifra con la clave actual y acepta
+descifrar con las claves retiradas, permitiendo rotar SECRET_KEY sin romper
+los datos ya cifrados.
+
+Variables de entorno:
+    SECRET_KEY          Clave actual (se deriva con PBKDF2).
+    SECURITY_SALT       Sal de la derivación.
+    OLD_SECRET_KEYS     Claves retiradas separadas por comas (se derivan).
+    OLD_SECURITY_SALTS  Sales retiradas separadas por comas: las claves actual
+                        y retiradas se derivan también con cada una de ellas.
+    FERNET_KEYS         Claves Fernet ya derivadas (base64 url-safe) separadas
+                        por comas. Si existe, la primera es la actual y no se
+                        ejecuta PBKDF2.
+"""
+import base64
+import os
+import threading
+from functools import lru_cache
+
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+KDF_ITERATIONS = 100000
+
+
+@lru_cache(maxsize=16)
+def derive_key(secret, salt, iterations=KDF_ITERATIONS):
+    """Deriva una clave Fernet (base64) a partir de un secreto. Resultado memorizado."""
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=iterations,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(secret.encode()))
+
+
+def _split_env(name):
+    return [v.strip() for v in os.environ.get(name, '').split(',') if v.strip()]
+
+
+class KeyRing:
+    """Conjunto de claves Fernet: la primera cifra, todas descifran."""
+
+    def __init__(self, keys):
+        if not keys:
+            raise ValueError('El anillo de claves necesita al menos una clave')
+        self.keys = list(keys)
+        self._fernets = [Fernet(k) for k in self.keys]
+        self._multi = MultiFernet(self._fernets)
+
+    @classmethod
+    def from_secrets(cls, current, retired=(), salt=b'', iterations=KDF_ITERATIONS, retired_salts=()):
+        """Construye el anillo derivando cada combinación de secreto y sal una única vez."""
+        keys = [derive_key(current, salt, iterations)]
+        for secret in [current, *retired]:
+            for old_salt in (salt, *retired_salts):
+                key = derive_key(secret, old_salt, iterations)
+                if key not in keys:
+                    keys.append(key)
+        return cls(keys)
+
+    @classmethod
+    def from_env(cls, secret_key, salt):
+        """Construye el anillo desde las variables de entorno de la aplicación."""
+        preloaded = _split_env('FERNET_KEYS')
+        if preloaded:
+            return cls([k.encode() for k in preloaded])
+        return cls.from_secrets(
+            secret_key, _split_env('OLD_SECRET_KEYS'), salt,
+            retired_salts=[s.encode() for s in _split_env('OLD_SECURITY_SALTS')],
+        )
+
+    @property
+    def cipher(self):
+        return self._multi
+
+    @property
+    def current(self):
+        """Fernet de la clave actual."""
+        return self._fernets[0]
+
+    def encrypt(self, data):
+        """Cifra una cadena con la clave actual."""
+        if not data:
+            return None
+        return self._multi.encrypt(data.encode()).decode()
+
+    def decrypt(self, token):
+        """Descifra una cadena con cualquiera de las claves del anillo."""
+        if not token:
+            return None
+        return self._multi.decrypt(token.encode()).decode()
+
+    def encrypt_many(self, values):
+        """Cifra una secuencia de cadenas reutilizando el mismo cifrador."""
+        return [self.encrypt(v) for v in values]
+
+    def decrypt_many(self, tokens, default=None):
+        """Descifra una secuencia; los tokens inválidos devuelven `default`."""
+        result = []
+        for token in tokens:
+            try:
+                result.append(self.decrypt(token))
+            except InvalidToken:
+                result.append(default)
+        return result
+
+    def is_current(self, token):
+        """Indica si el token ya está cifrado con la clave actual."""
+        try:
+            self.current.decrypt(token.encode())
+            return True
+        except InvalidToken:
+            return False
+
+    def rotate(self, token):
+        """Re-cifra un token con la clave actual (acepta tokens de claves retiradas)."""
+        if not token:
+            return token
+        return self._multi.rotate(token.encode()).decode()
+
+
+_keyring = None
+_keyring_lock = threading.Lock()
+
+
+def get_keyring(secret_key, salt):
+    """Devuelve el anillo del proceso, creándolo en el primer uso."""
+    global _keyring
+    if _keyring is None:
+        with _keyring_lock:
+            if _keyring is None:
+                _keyring = KeyRing.from_env(secret_key, salt)
+    return _keyring
+
+
+def reset_keyring():
+    """Descarta el anillo del proceso (p. ej. tras cambiar las variables de entorno)."""
+    global _keyring
+    with _keyring_lock:
+        _keyring = None
+    derive_key.cache_clear()
@@ -0,0 +1,197 @@
+"""
+Capa de acceso a datos de los dashboards.
+
+Cada función devuelve exactamente lo que pinta la plantilla, con el mínimo de
+consultas y apoyándose en los índices declarados en models.py.
+
+El snapshot del dashboard de cliente se cachea por worker durante
+CLIENT_SNAPSHOT_TTL segundos; las rutas que escriben datos del cliente deben
+llamar a `invalidate_client_snapshot(client_id)`.
+"""
+import os
+
+from sqlalchemy import String, exists, func, literal, null, union_all
+
+from identity_cache import TTLCache
+from models import db, Task, Project, SupportTicket, Document, User
+from pagination import clamp_page_size, decode_cursor, encode_cursor
+
+EMPLOYEE_UPCOMING_TASKS = int(os.environ.get('EMPLOYEE_UPCOMING_TASKS', '5'))
+CLIENT_RECENT_TICKETS = int(os.environ.get('CLIENT_RECENT_TICKETS', '5'))
+CLIENT_DOCUMENTS_PAGE = int(os.environ.get('CLIENT_DOCUMENTS_PAGE', '20'))
+CLIENT_SNAPSHOT_TTL = float(os.environ.get('CLIENT_SNAPSHOT_TTL', '60'))
+CLIENT_SNAPSHOT_CACHE_SIZE = int(os.environ.get('CLIENT_SNAPSHOT_CACHE_SIZE', '1024'))
+
+TASK_STATUSES = ('pendiente', 'en_proceso', 'completada')
+
+
+def task_status_counts(user_id):
+    """Conteo de tareas por estado con un único GROUP BY (ix_tasks_assigned_status)."""
+    rows = db.session.execute(
+        db.select(Task.status, func.count(Task.id))
+        .where(Task.assigned_to == user_id)
+        .group_by(Task.status)
+    ).all()
+    counts = dict.fromkeys(TASK_STATUSES, 0)
+    for status, count in rows:
+        counts[status or 'pendiente'] = counts.get(status or 'pendiente', 0) + count
+    return counts
+
+
+def upcoming_tasks(user_id, limit=EMPLOYEE_UPCOMING_TASKS):
+    """
+    Próximas tareas sin completar por fecha de vencimiento
+    (ix_tasks_assigned_due_date). La lista completa se pagina desde
+    /employee/tasks.
+    """
+    return (
+        Task.query
+        .filter(Task.assigned_to == user_id, db.or_(Task.status.is_(None), Task.status != 'completada'))
+        .order_by(Task.due_date.asc().nulls_last(), Task.id.asc())
+        .limit(limit)
+        .all()
+    )
+
+
+def employee_projects(user_id):
+    """Proyectos con al menos una tarea asignada al empleado (EXISTS, sin DISTINCT)."""
+    has_task = exists().where(Task.project_id == Project.id, Task.assigned_to == user_id)
+    return Project.query.filter(has_task).order_by(Project.id.asc()).all()
+
+
+def employee_dashboard_data(user_id):
+    """Datos del dashboard de empleado: tres consultas independientes del tamaño del historial."""
+    counts = task_status_counts(user_id)
+    total = sum(counts.values())
+    return {
+        'my_tasks': upcoming_tasks(user_id),
+        'my_projects': employee_projects(user_id),
+        'pending_tasks': counts['pendiente'],
+        'in_progress_tasks': counts['en_proceso'],
+        'completed_tasks': counts['completada'],
+        'total_tasks': total,
+        'completion_rate': round(counts['completada'] * 100 / total) if total else 0,
+    }
+
+
+_client_snapshots = TTLCache(maxsize=CLIENT_SNAPSHOT_CACHE_SIZE, ttl=CLIENT_SNAPSHOT_TTL)
+
+
+def client_projects_and_note(client_id):
+    """
+    Primera ida y vuelta: nota cifrada, tickets abiertos y proyectos del cliente.
+    El LEFT JOIN desde users garantiza una fila aunque no haya proyectos.
+    """
+    open_tickets = (
+        db.select(func.count(SupportTicket.id))
+        .where(SupportTicket.client_id == User.id, SupportTicket.status == 'abierto')
+        .correlate(User)
+        .scalar_subquery()
+    )
+    rows = db.session.execute(
+        db.select(
+            User.encrypted_note, open_tickets.label('open_tickets'),
+            Project.id, Project.name, Project.description, Project.status,
+            Project.progress, Project.deadline,
+        )
+        .select_from(User)
+        .outerjoin(Project, Project.client_id == User.id)
+        .where(User.id == client_id)
+        .order_by(Project.id.asc())
+    ).all()
+    if not rows:
+        return None, 0, []
+    projects = [row for row in rows if row.id is not None]
+    return rows[0].encrypted_note, rows[0].open_tickets or 0, projects
+
+
+def client_tickets_and_documents(client_id, docs_cursor=None, docs_limit=CLIENT_DOCUMENTS_PAGE):
+    """
+    Segunda ida y vuelta: últimos tickets y una página de documentos en un
+    UNION ALL (ix_tickets_client_created_at e ix_documents_client_id).
+    Devuelve (tickets, documentos, next_cursor de documentos).
+    """
+    page_size = clamp_page_size(docs_limit, default=CLIENT_DOCUMENTS_PAGE)
+    tickets = (
+        db.select(
+            literal('ticket', String).label('kind'), SupportTicket.id,
+            SupportTicket.subject.label('title'), SupportTicket.message.label('body'),
+            SupportTicket.status, SupportTicket.priority, null().label('file_type'),
+            SupportTicket.created_at,
+        )
+        .where(SupportTicket.client_id == client_id)
+        .order_by(SupportTicket.created_at.desc(), SupportTicket.id.desc())
+        .limit(CLIENT_RECENT_TICKETS)
+    )
+    documents = (
+        db.select(
+            literal('document', String).label('kind'), Document.id,
+            Document.title, Document.description.label('body'),
+            null().label('status'), null().label('priority'), Document.file_type,
+            Document.created_at,
+        )
+        .where(Document.client_id == client_id)
+        .order_by(Document.id.asc())
+        .limit(page_size + 1)
+    )
+    position = decode_cursor(docs_cursor)
+    if position is not None:
+        documents = documents.where(Document.id > position[1])
+
+    # Cada rama va en su propia subconsulta para conservar su ORDER BY/LIMIT
+    rows = db.session.execute(
+        union_all(tickets.subquery().select(), documents.subquery().select())
+    ).all()
+
+    ticket_rows = sorted(
+        (row for row in rows if row.kind == 'ticket'),
+        key=lambda row: (row.created_at is not None, row.created_at, row.id), reverse=True,
+    )
+    recent_tickets = [{
+        'id': row.id, 'subject': row.title, 'message': row.body, 'status': row.status,
+        'priority': row.priority, 'created_at': row.created_at,
+    } for row in ticket_rows]
+    document_rows = sorted((row for row in rows if row.kind == 'document'), key=lambda row: row.id)
+    next_cursor = None
+    if len(document_rows) > page_size:
+        document_rows = document_rows[:page_size]
+        next_cursor = encode_cursor(None, document_rows[-1].id)
+    docs = [{'id': row.id, 'title': row.title, 'file_type': row.file_type or ''} for row in document_rows]
+    return recent_tickets, docs, next_cursor
+
+
+def build_client_snapshot(client_id, docs_cursor=None):
+    """Modelo de vista del dashboard de cliente en dos idas y vueltas."""
+    encrypted_note, open_tickets, projects = client_projects_and_note(client_id)
+    recent_tickets, docs, next_cursor = client_tickets_and_documents(client_id, docs_cursor)
+    return {
+        'my_projects': projects,
+        'my_tickets': recent_tickets,
+        'my_documents': docs,
+        'documents_next_cursor': next_cursor,
+        'active_projects': sum(1 for p in projects if p.status == 'activo'),
+        'completed_projects': sum(1 for p in projects if p.status == 'completado'),
+        'open_tickets': open_tickets,
+        # Se cachea el texto cifrado; el descifrado se hace en cada vista
+        'encrypted_note': encrypted_note,
+    }
+
+
+def client_dashboard_data(client_id, docs_cursor=None, refresh=False):
+    """
+    Snapshot del dashboard de cliente. Solo la primera página de documentos se
+    cachea; `refresh=True` fuerza la recarga (p. ej. tras una escritura
+    atendida por otro worker).
+    """
+    if docs_cursor:
+        return build_client_snapshot(client_id, docs_cursor)
+    snapshot = None if refresh else _client_snapshots.get(client_id)
+    if snapshot is None:
+        snapshot = build_client_snapshot(client_id)
+        _client_snapshots.put(client_id, snapshot)
+    return snapshot
+
+
+def invalidate_client_snapshot(client_id):
+    """Descarta el snapshot cacheado de un cliente."""
+    _client_snapshots.invalidate(int(client_id))
@@ -0,0 +1,62 @@
+"""Configuración de gunicorn derivada de CPU/memoria (ver server_config.py)."""
+import os
+import shutil
+import tempfile
+
+from server_config import gunicorn_settings, log_settings
+
+# Modo multiproceso de prometheus_client: debe fijarse antes de importar la aplicación.
+# Los valores de una ejecución anterior falsearían los contadores agregados.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'prometheus_multiproc'))
+shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+_settings = gunicorn_settings()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+worker_class = 'gthread'
+workers = _settings['workers']
+threads = _settings['threads']
+timeout = _settings['timeout']
+graceful_timeout = 20
+keepalive = 5
+# Reciclado escalonado de workers para contener fugas de memoria en la VM de 256 MB
+max_requests = _settings['max_requests']
+max_requests_jitter = max_requests // 10
+# La aplicación se importa una vez en el maestro; el esquema se prepara con `flask bootstrap`
+preload_app = True
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    log_settings(server.log.info, **_settings)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    # Con preload_app la aplicación ya está importada en el maestro
+    from app import app
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    log_settings(server.log.info, **{k: v for k, v in options.items() if k != 'connect_args'})
+
+
+def post_worker_init(worker):
+    # Ejecutor de trabajos dentro de cada worker, solo con JOBS_IN_PROCESS=1;
+    # por defecto los trabajos van en un proceso aparte (`flask jobs work`)
+    from app import app
+    from jobs import start_background_worker
+    start_background_worker(app)
+
+
+def worker_exit(server, worker):
+    # Un worker reciclado (max_requests) o detenido devuelve sus trabajos a la
+    # cola en vez de dejarlos bloqueados hasta JOB_LOCK_TIMEOUT
+    from jobs import stop_background_worker
+    released = stop_background_worker(timeout=graceful_timeout // 2)
+    if released:
+        server.log.info(f"Worker {worker.pid}: {released} trabajos devueltos a la cola")
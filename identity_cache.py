@@ -0,0 +1,123 @@
+"""
+Caché de identidades para el user_loader de Flask-Login.
+
+Cada petición autenticada necesita `current_user` solo para comprobar el rol
+y mostrar el nombre. En lugar de cargar la fila completa (incluida la nota
+cifrada) en cada petición, se guarda por worker un objeto ligero con `id`,
+`username`, `role` y `email` en una LRU con TTL. La entidad completa se carga
+bajo demanda con `get_entity()`.
+
+Las rutas que modifican usuarios (edición, borrado, cambio de contraseña)
+deben llamar a `invalidate_identity(user_id)`. Otros workers verán el cambio
+como mucho IDENTITY_CACHE_TTL segundos después.
+
+Un usuario con una eliminación en segundo plano sin terminar (tabla
+`user_deletions`) no se carga: sus sesiones dejan de valer en cuanto se
+programa el borrado en este worker y, en el resto, al caducar la entrada.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g
+from flask_login import UserMixin
+
+from models import db, User, UserDeletion
+
+IDENTITY_CACHE_SIZE = int(os.environ.get('IDENTITY_CACHE_SIZE', '1024'))
+IDENTITY_CACHE_TTL = float(os.environ.get('IDENTITY_CACHE_TTL', '30'))
+
+
+class CachedUser(UserMixin):
+    """Identidad ligera e inmutable; compartida entre peticiones del mismo worker."""
+
+    FIELDS = ('id', 'username', 'role', 'email')
+
+    def __init__(self, id, username, role, email):
+        for name, value in zip(self.FIELDS, (id, username, role, email)):
+            object.__setattr__(self, name, value)
+
+    def get_entity(self):
+        """Carga (una vez por petición) la entidad User completa."""
+        cache = g.setdefault('_user_entities', {})
+        if self.id not in cache:
+            cache[self.id] = db.session.get(User, self.id)
+        return cache[self.id]
+
+    def __getattr__(self, name):
+        # Atributos no cacheados (p. ej. encrypted_note): se leen de la entidad
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.get_entity(), name)
+
+    def __setattr__(self, name, value):
+        # Las escrituras van siempre a la entidad de la sesión, nunca al objeto compartido
+        setattr(self.get_entity(), name, value)
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+
+class TTLCache:
+    """LRU con TTL, segura entre hilos. También la usa la caché de snapshots de dashboard_data."""
+
+    def __init__(self, maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if time.monotonic() >= expires:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_cache = TTLCache()
+
+
+def load_identity(user_id):
+    """Devuelve la identidad ligera del usuario, consultando la BD solo si no está en caché."""
+    user_id = int(user_id)
+    identity = _cache.get(user_id)
+    if identity is not None:
+        return identity
+    being_deleted = db.exists().where(
+        UserDeletion.user_id == User.id, UserDeletion.status != 'completada'
+    )
+    row = db.session.execute(
+        db.select(User.id, User.username, User.role, User.email).where(User.id == user_id, ~being_deleted)
+    ).first()
+    if row is None:
+        return None
+    identity = CachedUser(row.id, row.username, row.role, row.email)
+    _cache.put(user_id, identity)
+    return identity
+
+
+def invalidate_identity(user_id):
+    """Descarta la identidad cacheada de un usuario."""
+    _cache.invalidate(int(user_id))
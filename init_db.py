@@ -1,13 +1,22 @@
-from app import app, encrypt_data
+import argparse
+import csv
+import io
+import random
+import time
+from app import app, encrypt_data, SECRET_KEY, SECURE_SALT
 from models import db, User, Task, Project, SupportTicket, Document
 from datetime import datetime, timedelta
+from sqlalchemy import func, insert, text
 from werkzeug.security import generate_password_hash
+from crypto_keys import get_keyring
+from migrations import run_migrations
+from server_config import disable_statement_timeout
 
 def init_db():
     """Inicializa la base de datos con tablas y datos de ejemplo."""
     with app.app_context():
-        print("Creando tablas si no existen...")
-        db.create_all()
+        print("Aplicando migraciones de esquema...")
+        run_migrations()
 
         # Si ya hay usuarios, no insertar datos de nuevo
         if User.query.first():
@@ -165,5 +174,214 @@ def init_db():
         print("CLIENTES: cliente1, cliente2, cliente3 | cli123")
         print("==========================================")
 
+
+# DATOS SINTÉTICOS (pruebas de carga)
+
+SYNTHETIC_BATCH_SIZE = 10000
+
+ROLE_WEIGHTS = {'admin': 1, 'empleado': 29, 'cliente': 70}
+TASK_STATUS_WEIGHTS = {'pendiente': 30, 'en_proceso': 20, 'completada': 50}
+TASK_PRIORITY_WEIGHTS = {'baja': 30, 'media': 50, 'alta': 20}
+PROJECT_STATUS_WEIGHTS = {'activo': 60, 'completado': 30, 'cancelado': 10}
+TICKET_STATUS_WEIGHTS = {'abierto': 25, 'en_proceso': 15, 'resuelto': 60}
+TICKET_PRIORITY_WEIGHTS = {'baja': 20, 'normal': 50, 'alta': 20, 'urgente': 10}
+DOCUMENT_TYPES = ['factura', 'contrato', 'reporte']
+
+
+def _choices(rng, weights, k):
+    return rng.choices(list(weights), weights=list(weights.values()), k=k)
+
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _copy_rows(table, columns, rows):
+    """Inserta filas con COPY (PostgreSQL) a través de la conexión DBAPI."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['\\N' if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    raw = db.session.connection().connection
+    with raw.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+        )
+
+
+def _bulk_insert(model, rows):
+    """Inserta un lote de diccionarios con COPY o executemany según el motor."""
+    if not rows:
+        return
+    if db.engine.dialect.name == 'postgresql':
+        _copy_rows(model.__tablename__, list(rows[0]), rows)
+    else:
+        db.session.execute(insert(model), rows)
+    db.session.commit()
+
+
+def _generate(model, total, make_batch, label):
+    start = time.perf_counter()
+    first_id = _next_id(model)
+    for offset in range(0, total, SYNTHETIC_BATCH_SIZE):
+        size = min(SYNTHETIC_BATCH_SIZE, total - offset)
+        _bulk_insert(model, make_batch(first_id + offset, size))
+    print(f"✓ {total} {label} en {time.perf_counter() - start:.1f}s")
+    return first_id, first_id + total
+
+
+def _sync_sequences():
+    """Ajusta las secuencias de PostgreSQL tras insertar ids explícitos."""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for model in (User, Project, Task, SupportTicket, Document):
+        table = model.__tablename__
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+        ))
+    db.session.commit()
+
+
+def init_synthetic_db(users=1000, projects=None, tasks=10000, tickets=5000, documents=None,
+                      password='load123', seed=42):
+    """
+    Genera volúmenes configurables de datos realistas para pruebas de carga.
+    Usa inserciones masivas (COPY en PostgreSQL), un único hash de contraseña
+    precalculado por ejecución y cifrado por lotes con la clave ya derivada.
+    """
+    projects = users // 2 if projects is None else projects
+    documents = users if documents is None else documents
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    run_tag = f"{seed}_{int(time.time())}"
+
+    with app.app_context():
+        run_migrations()
+        password_hash = generate_password_hash(password)
+        keyring = get_keyring(SECRET_KEY, SECURE_SALT)
+        employees, clients = [], []
+
+        def users_batch(first, size):
+            roles = _choices(rng, ROLE_WEIGHTS, size)
+            with_note = [rng.random() < 0.1 for _ in range(size)]
+            notes = keyring.encrypt_many(
+                [f"Nota sintética {first + i}" if with_note[i] else None for i in range(size)]
+            )
+            batch = []
+            for i in range(size):
+                user_id = first + i
+                if roles[i] == 'empleado':
+                    employees.append(user_id)
+                elif roles[i] == 'cliente':
+                    clients.append(user_id)
+                batch.append({
+                    'id': user_id,
+                    'username': f"user_{run_tag}_{user_id}",
+                    'password_hash': password_hash,
+                    'role': roles[i],
+                    'email': f"user{user_id}@carga.test",
+                    'created_at': now - timedelta(days=rng.randint(0, 1000)),
+                    'last_login': None,
+                    'encrypted_note': notes[i],
+                })
+            return batch
+
+        _generate(User, users, users_batch, 'usuarios')
+        if not employees or not clients:
+            print("✗ La muestra no contiene empleados y clientes; aumenta --users")
+            return
+
+        def projects_batch(first, size):
+            statuses = _choices(rng, PROJECT_STATUS_WEIGHTS, size)
+            return [{
+                'id': first + i,
+                'name': f"Proyecto {first + i}",
+                'description': "Proyecto generado para pruebas de carga",
+                'status': statuses[i],
+                'progress': 100 if statuses[i] == 'completado' else rng.randint(0, 95),
+                'client_id': rng.choice(clients),
+                'created_at': now - timedelta(days=rng.randint(0, 700)),
+                'deadline': now + timedelta(days=rng.randint(-60, 180)),
+            } for i in range(size)]
+
+        first_project, end_project = _generate(Project, projects, projects_batch, 'proyectos')
+
+        def tasks_batch(first, size):
+            statuses = _choices(rng, TASK_STATUS_WEIGHTS, size)
+            priorities = _choices(rng, TASK_PRIORITY_WEIGHTS, size)
+            batch = []
+            for i in range(size):
+                created = now - timedelta(days=rng.randint(0, 365))
+                batch.append({
+                    'id': first + i,
+                    'title': f"Tarea {first + i}",
+                    'description': None,
+                    'status': statuses[i],
+                    'priority': priorities[i],
+                    'assigned_to': rng.choice(employees),
+                    'created_at': created,
+                    'due_date': created + timedelta(days=rng.randint(1, 60)),
+                    'completed_at': created + timedelta(days=rng.randint(0, 30)) if statuses[i] == 'completada' else None,
+                    'project_id': rng.randrange(first_project, end_project) if projects else None,
+                })
+            return batch
+
+        _generate(Task, tasks, tasks_batch, 'tareas')
+
+        def tickets_batch(first, size):
+            statuses = _choices(rng, TICKET_STATUS_WEIGHTS, size)
+            priorities = _choices(rng, TICKET_PRIORITY_WEIGHTS, size)
+            return [{
+                'id': first + i,
+                'subject': f"Incidencia {first + i}",
+                'message': "Ticket generado para pruebas de carga",
+                'status': statuses[i],
+                'priority': priorities[i],
+                'client_id': rng.choice(clients),
+                'created_at': now - timedelta(minutes=rng.randint(0, 525600)),
+                'updated_at': None,
+            } for i in range(size)]
+
+        _generate(SupportTicket, tickets, tickets_batch, 'tickets')
+
+        def documents_batch(first, size):
+            types = rng.choices(DOCUMENT_TYPES, k=size)
+            return [{
+                'id': first + i,
+                'title': f"Documento {first + i}",
+                'description': "Documento generado para pruebas de carga",
+                'file_type': types[i],
+                'client_id': rng.choice(clients),
+                'project_id': rng.randrange(first_project, end_project) if projects else None,
+                'created_at': now - timedelta(days=rng.randint(0, 700)),
+            } for i in range(size)]
+
+        _generate(Document, documents, documents_batch, 'documentos')
+        _sync_sequences()
+        print(f"✓ Datos sintéticos generados. Contraseña de todos los usuarios: {password}")
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Inicializa la base de datos.")
+    parser.add_argument('--synthetic', action='store_true', help="Generar datos sintéticos para pruebas de carga")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--projects', type=int, default=None)
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--tickets', type=int, default=5000)
+    parser.add_argument('--documents', type=int, default=None)
+    parser.add_argument('--password', default='load123')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    init_db()
+    args = _parse_args()
+    with app.app_context():
+        disable_statement_timeout(db.engine)
+    if args.synthetic:
+        init_synthetic_db(users=args.users, projects=args.projects, tasks=args.tasks,
+                          tickets=args.tickets, documents=args.documents,
+                          password=args.password, seed=args.seed)
+    else:
+        init_db()
@@ -0,0 +1,186 @@
+"""
+Instrumentación por petición: consultas SQL, tiempos y cabecera Server-Timing.
+
+Por cada petición muestreada se registra el número de consultas, el tiempo
+total en base de datos, la sentencia más lenta, el tiempo de renderizado de
+plantillas y el tiempo de criptografía (Fernet y KDF de contraseñas). Los
+valores se registran en una línea de log JSON y se exponen en la cabecera
+`Server-Timing`, que solo reciben los administradores (o cualquiera con
+SERVER_TIMING_PUBLIC=1 o en modo debug, p. ej. para benchmark.py): revela
+cuántas consultas hace cada ruta.
+
+El coste por consulta es un `perf_counter()` y una suma, así que puede quedar
+activo en producción; INSTRUMENTATION_SAMPLE_RATE (0..1, por defecto 0.01)
+limita qué fracción de peticiones se mide y registra.
+
+`query_budget` comprueba el número de consultas de un bloque; lo usa
+verify_query_budgets.py para fijar el presupuesto de cada panel.
+"""
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from flask import before_render_template, current_app, g, has_app_context, request, template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('instrumentation')
+
+INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get('INSTRUMENTATION_SAMPLE_RATE', '0.01'))
+SERVER_TIMING_PUBLIC = os.environ.get('SERVER_TIMING_PUBLIC', '0') == '1'
+SLOW_STATEMENT_CHARS = 200
+
+
+class RequestMetrics:
+    """Acumulador de métricas de una petición."""
+
+    __slots__ = ('start', 'queries', 'db_ms', 'slowest_ms', 'slowest_sql',
+                 'template_ms', 'crypto_ms', '_template_start')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = None
+        self.template_ms = 0.0
+        self.crypto_ms = 0.0
+        self._template_start = None
+
+    def record_query(self, statement, elapsed_ms):
+        self.queries += 1
+        self.db_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_sql = statement[:SLOW_STATEMENT_CHARS]
+
+    def total_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def server_timing(self):
+        return (
+            f'sql;desc="{self.queries}";dur={self.db_ms:.1f}, '
+            f'tpl;dur={self.template_ms:.1f}, '
+            f'crypto;dur={self.crypto_ms:.1f}, '
+            f'total;dur={self.total_ms():.1f}'
+        )
+
+
+def current_metrics():
+    """Métricas de la petición en curso (None si no se muestrea o no hay contexto)."""
+    if not has_app_context():
+        return None
+    return g.get('_request_metrics')
+
+
+@contextmanager
+def timed_crypto():
+    """Suma al contador de criptografía el tiempo del bloque."""
+    metrics = current_metrics()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.crypto_ms += (time.perf_counter() - start) * 1000
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_metrics() is not None:
+        conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = current_metrics()
+    starts = conn.info.get('_query_start')
+    if metrics is not None and starts:
+        metrics.record_query(statement, (time.perf_counter() - starts.pop()) * 1000)
+
+
+def _before_render(sender, template, context, **extra):
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics._template_start = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    metrics = current_metrics()
+    if metrics is not None and metrics._template_start is not None:
+        metrics.template_ms += (time.perf_counter() - metrics._template_start) * 1000
+        metrics._template_start = None
+
+
+def _exposes_server_timing():
+    if SERVER_TIMING_PUBLIC or current_app.debug:
+        return True
+    return current_user.is_authenticated and getattr(current_user, 'role', None) == 'admin'
+
+
+def init_instrumentation(app, sample_rate=INSTRUMENTATION_SAMPLE_RATE):
+    """Registra los hooks de petición y las señales de plantillas."""
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def _start_metrics():
+        if sample_rate >= 1.0 or random.random() < sample_rate:
+            g._request_metrics = RequestMetrics()
+
+    @app.after_request
+    def _emit_metrics(response):
+        metrics = g.pop('_request_metrics', None)
+        if metrics is None:
+            return response
+        if _exposes_server_timing():
+            response.headers['Server-Timing'] = metrics.server_timing()
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'total_ms': round(metrics.total_ms(), 2),
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_ms, 2),
+            'slowest_ms': round(metrics.slowest_ms, 2),
+            'slowest_sql': metrics.slowest_sql,
+            'template_ms': round(metrics.template_ms, 2),
+            'crypto_ms': round(metrics.crypto_ms, 2),
+        }))
+        return response
+
+
+@contextmanager
+def query_budget(max_queries):
+    """
+    Falla si el bloque ejecuta más de `max_queries` consultas. Pensado para
+    tests de rutas, p. ej. con el test_client de Flask:
+
+        with query_budget(3):
+            client.get('/admin')
+    """
+    counter = {'queries': 0}
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter['queries'] += 1
+
+    event.listen(Engine, 'after_cursor_execute', _count)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, 'after_cursor_execute', _count)
+    if counter['queries'] > max_queries:
+        raise AssertionError(f"Se ejecutaron {counter['queries']} consultas (presupuesto: {max_queries})")
@@ -0,0 +1,303 @@
+"""
+Trabajos en segundo plano persistentes.
+
+Las operaciones largas (borrado de cuentas grandes, recifrado, etc.) se
+encolan en la tabla `jobs` y la ruta responde al instante. Un ejecutor los
+reclama y los procesa fuera del hilo de la petición:
+
+- PostgreSQL: `SELECT ... FOR UPDATE SKIP LOCKED`, de modo que varios
+  ejecutores (uno por worker de gunicorn o procesos aparte) no se pisan.
+- SQLite: UPDATE condicional `WHERE status = 'pendiente'`; SQLite serializa
+  las escrituras y solo un ejecutor consigue la fila.
+
+Un trabajo que falla se reintenta con espera exponencial hasta
+`max_attempts`. Al recibir SIGTERM/SIGINT el ejecutor se detiene en el
+siguiente `ctx.progress` y devuelve el trabajo a la cola con su punto de
+control, sin gastar un intento. Si muere sin avisar, el trabajo vuelve a la
+cola cuando su bloqueo supera JOB_LOCK_TIMEOUT, así que los manejadores deben
+poder reanudarse.
+
+Uso:
+    flask --app app jobs work          # ejecutor dedicado (proceso aparte)
+    flask --app app jobs work --once   # procesa los trabajos pendientes y termina
+    python jobs.py [--once]            # equivalente
+
+Los trabajos pesados no deben ocupar los workers web, así que por defecto se
+ejecutan en ese proceso aparte. Con JOBS_IN_PROCESS=1 cada worker de gunicorn
+arranca además un ejecutor en un hilo; al salir el worker (reciclado por
+max_requests, despliegue) el hook `worker_exit` lo detiene y libera sus
+trabajos en lugar de esperar a que caduque el bloqueo.
+"""
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+
+from models import db, Job
+
+logger = logging.getLogger('jobs')
+
+JOBS_IN_PROCESS = os.environ.get('JOBS_IN_PROCESS', '0') == '1'
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', '2'))
+JOB_LOCK_TIMEOUT = int(os.environ.get('JOB_LOCK_TIMEOUT', '900'))
+JOB_RETRY_DELAY = int(os.environ.get('JOB_RETRY_DELAY', '10'))
+
+HANDLERS = {}
+
+# Se activa para que el ejecutor de este proceso termine en cuanto pueda
+_stop = threading.Event()
+
+
+class JobInterrupted(BaseException):
+    """
+    El ejecutor se está deteniendo. Hereda de BaseException para que los
+    `except Exception` de los manejadores no lo confundan con un fallo.
+    """
+
+
+def job_handler(kind):
+    """Registra la función que ejecuta los trabajos de tipo `kind`."""
+    def decorator(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def enqueue(kind, payload=None, created_by=None, max_attempts=3):
+    """Encola un trabajo y lo confirma; devuelve el Job."""
+    if kind not in HANDLERS:
+        raise ValueError(f'Tipo de trabajo desconocido: {kind}')
+    job = Job(kind=kind, payload=json.dumps(payload or {}), created_by=created_by,
+              max_attempts=max_attempts, run_after=datetime.utcnow())
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+class JobContext:
+    """Lo que recibe un manejador: el payload y un canal para informar del progreso."""
+
+    def __init__(self, job):
+        self.job = job
+        self.payload = json.loads(job.payload or '{}')
+        self.checkpoint = json.loads(job.checkpoint) if job.checkpoint else None
+
+    def progress(self, done, total, checkpoint=None):
+        """
+        Guarda el porcentaje completado (y, si se indica, el punto de control
+        desde el que reanudar) y renueva el bloqueo del trabajo.
+        """
+        percent = 100 if not total else min(99, int(done * 100 / total))
+        values = {'progress': percent, 'locked_at': datetime.utcnow(), 'updated_at': datetime.utcnow()}
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+            values['checkpoint'] = json.dumps(checkpoint)
+        db.session.execute(update(Job).where(Job.id == self.job.id).values(**values))
+        db.session.commit()
+        if _stop.is_set():
+            raise JobInterrupted()
+
+
+def _claimable(now):
+    stale = now - timedelta(seconds=JOB_LOCK_TIMEOUT)
+    return or_(
+        (Job.status == 'pendiente') & (Job.run_after <= now),
+        (Job.status == 'en_proceso') & (Job.locked_at < stale),
+    )
+
+
+def claim_next(worker_id):
+    """Reclama el siguiente trabajo disponible o devuelve None."""
+    now = datetime.utcnow()
+    query = db.select(Job.id, Job.status).where(_claimable(now)).order_by(Job.run_after, Job.id).limit(1)
+    if db.engine.dialect.name == 'postgresql':
+        row = db.session.execute(query.with_for_update(skip_locked=True)).first()
+        if row is None:
+            db.session.rollback()
+            return None
+    else:
+        row = db.session.execute(query).first()
+        if row is None:
+            return None
+    claimed = db.session.execute(
+        update(Job)
+        .where(Job.id == row.id, Job.status == row.status, _claimable(now))
+        .values(status='en_proceso', locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+    ).rowcount
+    db.session.commit()
+    return db.session.get(Job, row.id) if claimed else None
+
+
+def run_job(job):
+    """Ejecuta un trabajo reclamado y registra el resultado o el fallo."""
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f'Sin manejador para {job.kind}')
+        result = handler(JobContext(job))
+    except JobInterrupted:
+        db.session.rollback()
+        job = db.session.get(Job, job.id)
+        logger.info(f"Trabajo {job.id} ({job.kind}) interrumpido; vuelve a la cola")
+        _release(job)
+        db.session.commit()
+        return job
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job.id)
+        logger.error(f"Trabajo {job.id} ({job.kind}) falló en el intento {job.attempts}: {str(e)}")
+        job.error = str(e)[:1000]
+        job.locked_by = None
+        if job.attempts < job.max_attempts and handler is not None:
+            job.status = 'pendiente'
+            job.run_after = datetime.utcnow() + timedelta(seconds=JOB_RETRY_DELAY * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'error'
+        db.session.commit()
+        return job
+    job = db.session.get(Job, job.id)
+    job.status = 'completado'
+    job.progress = 100
+    job.error = None
+    job.locked_by = None
+    job.result = json.dumps(result) if result is not None else None
+    db.session.commit()
+    return job
+
+
+def _release(job):
+    """Devuelve a la cola un trabajo interrumpido; el intento no cuenta."""
+    job.status = 'pendiente'
+    job.locked_by = None
+    job.run_after = datetime.utcnow()
+    job.attempts = max((job.attempts or 1) - 1, 0)
+
+
+def _process_prefix():
+    return f'{socket.gethostname()}:{os.getpid()}:'
+
+
+def release_claimed(worker_prefix=None):
+    """
+    Devuelve a la cola los trabajos en proceso reclamados por los ejecutores
+    de este proceso (o de `worker_prefix`); devuelve cuántos. Debe llamarse
+    dentro de un app_context.
+    """
+    worker_prefix = worker_prefix or _process_prefix()
+    released = db.session.execute(
+        update(Job)
+        .where(Job.status == 'en_proceso', Job.locked_by.startswith(worker_prefix, autoescape=True))
+        .values(status='pendiente', locked_by=None, run_after=datetime.utcnow(),
+                attempts=Job.attempts - 1, updated_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return released
+
+
+def work(worker_id=None, once=False, poll_interval=JOB_POLL_INTERVAL):
+    """Bucle del ejecutor. Debe llamarse dentro de un app_context."""
+    worker_id = worker_id or f'{_process_prefix()}{threading.get_ident()}'
+    while not _stop.is_set():
+        try:
+            job = claim_next(worker_id)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error al reclamar trabajos: {str(e)}")
+            job = None
+        if job is not None:
+            try:
+                run_job(job)
+            except Exception as e:
+                # Ni siquiera se pudo registrar el fallo: el bloqueo caducará y se reintentará
+                db.session.rollback()
+                logger.error(f"Error al ejecutar el trabajo {job.id}: {str(e)}")
+            continue
+        if once:
+            return
+        db.session.remove()
+        _stop.wait(poll_interval)
+
+
+def job_status(job):
+    """Representación JSON de un trabajo para la API de estado."""
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress or 0,
+        'attempts': job.attempts or 0,
+        'max_attempts': job.max_attempts,
+        'error': job.error,
+        'result': json.loads(job.result) if job.result else None,
+        'created_at': job.created_at.strftime('%Y-%m-%d %H:%M:%S') if job.created_at else None,
+        'updated_at': job.updated_at.strftime('%Y-%m-%d %H:%M:%S') if job.updated_at else None,
+    }
+
+
+def run_worker(once=False):
+    """
+    Ejecutor dedicado: procesa la cola hasta recibir SIGTERM o SIGINT. Debe
+    llamarse dentro de un app_context.
+    """
+    def _request_stop(signum, frame):
+        logger.info("Deteniendo el ejecutor de trabajos...")
+        _stop.set()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+    work(once=once)
+
+
+_background = {'thread': None, 'pid': None, 'app': None}
+
+
+def start_background_worker(app):
+    """Arranca un ejecutor en un hilo daemon del proceso actual (uno por proceso)."""
+    if not JOBS_IN_PROCESS:
+        return None
+    if _background['thread'] is not None and _background['pid'] == os.getpid():
+        return _background['thread']
+
+    def _loop():
+        with app.app_context():
+            work()
+
+    _stop.clear()
+    thread = threading.Thread(target=_loop, name='jobs-worker', daemon=True)
+    thread.start()
+    _background.update(thread=thread, pid=os.getpid(), app=app)
+    return thread
+
+
+def stop_background_worker(timeout=10):
+    """
+    Detiene el ejecutor en hilo de este proceso y libera lo que tuviera
+    reclamado. Si el trabajo en curso no llega a un `ctx.progress` en
+    `timeout` segundos, se libera igualmente: los manejadores son reanudables.
+    """
+    thread = _background['thread']
+    if thread is None or _background['pid'] != os.getpid():
+        return 0
+    _stop.set()
+    thread.join(timeout)
+    with _background['app'].app_context():
+        released = release_claimed()
+    _background.update(thread=None, pid=None)
+    return released
+
+
+if __name__ == '__main__':
+    # Este fichero corre como __main__, con su propio HANDLERS vacío: los
+    # manejadores se registran en el módulo `jobs` que importa la aplicación
+    from app import app
+    import jobs
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    with app.app_context():
+        jobs.run_worker(once='--once' in sys.argv)
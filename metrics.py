@@ -0,0 +1,117 @@
+"""
+Métricas Prometheus de la aplicación.
+
+Con gunicorn se usa el modo multiproceso de prometheus_client: cada worker
+escribe sus valores en PROMETHEUS_MULTIPROC_DIR (lo prepara gunicorn.conf.py)
+y la ruta /metrics agrega todos los workers vivos en cada scrape.
+
+Métricas expuestas:
+    http_request_duration_seconds     Histograma por endpoint, método y estado.
+    db_pool_checked_out / db_pool_size Conexiones en uso y tamaño del pool.
+    db_pool_checkout_wait_seconds     Espera para obtener una conexión.
+    ratelimit_rejections_total        Peticiones rechazadas por el limitador.
+    login_attempts_total              Intentos de login por resultado.
+    password_kdf_seconds              Duración del KDF de contraseñas.
+"""
+import hmac
+import os
+import time
+
+from flask import g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Latencia de las peticiones HTTP',
+    ['endpoint', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out', 'Conexiones de base de datos en uso', multiprocess_mode='livesum',
+)
+POOL_SIZE = Gauge(
+    'db_pool_size', 'Tamaño configurado del pool de conexiones', multiprocess_mode='livesum',
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds', 'Espera para obtener una conexión del pool',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10),
+)
+RATELIMIT_REJECTIONS = Counter(
+    'ratelimit_rejections_total', 'Peticiones rechazadas por el limitador', ['endpoint'],
+)
+LOGIN_ATTEMPTS = Counter(
+    'login_attempts_total', 'Intentos de inicio de sesión', ['result'],
+)
+KDF_DURATION = Histogram(
+    'password_kdf_seconds', 'Duración del KDF de contraseñas', ['operation'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide el tiempo de espera de cada checkout."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def _attach_pool_gauges(engine):
+    @event.listens_for(engine, 'checkout')
+    def _checkout(dbapi_connection, record, proxy):
+        # Se fija en cada checkout para que cada worker publique su propio pool
+        POOL_SIZE.set(getattr(engine.pool, 'size', lambda: 1)())
+        POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, 'checkin')
+    def _checkin(dbapi_connection, record):
+        POOL_CHECKED_OUT.dec()
+
+
+def is_authorized(user):
+    """Acceso con `Authorization: Bearer <METRICS_TOKEN>` o sesión de administrador."""
+    header = request.headers.get('Authorization', '')
+    if METRICS_TOKEN and header.startswith('Bearer '):
+        return hmac.compare_digest(header[7:], METRICS_TOKEN)
+    return user.is_authenticated and user.role == 'admin'
+
+
+def render_metrics():
+    """Devuelve (cuerpo, content-type) agregando todos los workers si aplica."""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_metrics(app, db):
+    """Registra los hooks de latencia y los gauges del pool de conexiones."""
+    with app.app_context():
+        for engine in db.engines.values():
+            _attach_pool_gauges(engine)
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_latency(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            REQUEST_LATENCY.labels(
+                endpoint=request.endpoint or 'unknown',
+                method=request.method,
+                status=response.status_code,
+            ).observe(time.perf_counter() - start)
+        return response
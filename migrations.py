@@ -0,0 +1,251 @@
+"""
+Migraciones versionadas del esquema.
+
+Sustituye al `db.create_all()` a ciegas: cada migración tiene un número de
+versión y se registra en la tabla `schema_migrations` al aplicarse, de modo
+que solo se ejecutan las pendientes. En PostgreSQL las migraciones se
+serializan con un advisory lock y los índices sobre tablas existentes se
+crean con `CREATE INDEX CONCURRENTLY`, sin bloquear escrituras.
+
+Uso:
+    python migrations.py            # aplica las migraciones pendientes
+    python migrations.py --status   # muestra la versión actual
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+
+from models import db, Task, Project, SupportTicket, Document, UserDeletion, Job
+from search import ensure_search_indexes
+
+MIGRATIONS_LOCK_ID = 72707369  # clave del pg_advisory_lock
+
+# Índices de las columnas más consultadas por los dashboards (ver models.py)
+HOT_INDEXES = [
+    index
+    for model in (Task, Project, SupportTicket, Document)
+    for index in model.__table__.indexes
+]
+
+
+def _create_index_online(name, table, definition):
+    """
+    Crea un índice sin bloquear la tabla (CONCURRENTLY en PostgreSQL).
+    `definition` es lo que sigue a `ON tabla`, p. ej. `(a, b)` o `USING gin (...)`.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        with db.engine.begin() as conn:
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} {definition}'))
+        return
+    # CONCURRENTLY no admite transacciones: conexión en autocommit
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        # Un CONCURRENTLY interrumpido deja un índice inválido: se elimina y se reintenta
+        invalid = conn.execute(text(
+            "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {'name': name}).first()
+        if invalid:
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {name}'))
+        conn.execute(text(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}'))
+
+
+def _initial_schema():
+    db.create_all()
+
+
+def _search_indexes():
+    ensure_search_indexes(_create_index_online)
+
+
+def _hot_indexes():
+    for index in HOT_INDEXES:
+        columns = ', '.join(column.name for column in index.columns)
+        _create_index_online(index.name, index.table.name, f'({columns})')
+
+
+def _add_column(table, column, sql_type):
+    """ALTER TABLE ADD COLUMN idempotente (columna nula, sin reescribir la tabla en PostgreSQL)."""
+    columns = {c['name'] for c in inspect(db.engine).get_columns(table)}
+    if column not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {sql_type}'))
+
+
+def _add_updated_at():
+    # Marca de modificación para las ETags (ver conditional.py)
+    for table in ('tasks', 'projects'):
+        _add_column(table, 'updated_at', 'TIMESTAMP')
+
+
+CASCADE_TABLES = (Project, Task, SupportTicket, Document)
+
+
+def _outdated_foreign_keys(table):
+    """Claves foráneas del modelo cuyo ON DELETE no coincide con el de la base de datos."""
+    existing = {
+        tuple(fk['constrained_columns']): fk
+        for fk in inspect(db.engine).get_foreign_keys(table.name)
+    }
+    outdated = []
+    for constraint in table.foreign_key_constraints:
+        current = existing.get(tuple(constraint.column_keys))
+        wanted = (constraint.ondelete or '').upper()
+        if current is None or (current.get('options', {}).get('ondelete') or '').upper() != wanted:
+            outdated.append((constraint, current and current.get('name')))
+    return outdated
+
+
+def _alter_foreign_keys_postgres(table, outdated):
+    for constraint, name in outdated:
+        element = next(iter(constraint.elements))
+        column = element.parent.name
+        target = element.column
+        name = name or f'{table.name}_{column}_fkey'
+        # NOT VALID + VALIDATE: el ADD solo bloquea un instante y la validación no bloquea escrituras
+        with db.engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {table.name} DROP CONSTRAINT IF EXISTS {name}'))
+            conn.execute(text(
+                f'ALTER TABLE {table.name} ADD CONSTRAINT {name} FOREIGN KEY ({column}) '
+                f'REFERENCES {target.table.name} ({target.name}) ON DELETE {constraint.ondelete} NOT VALID'
+            ))
+        with db.engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {table.name} VALIDATE CONSTRAINT {name}'))
+
+
+def _rebuild_sqlite_table(raw, table):
+    """SQLite no permite alterar restricciones: se recrea la tabla y se copian los datos."""
+    old_columns = {row[1] for row in raw.execute(f'PRAGMA table_info({table.name})')}
+    columns = ', '.join(c.name for c in table.columns if c.name in old_columns)
+    ddl = str(CreateTable(table).compile(dialect=db.engine.dialect)).strip()
+    raw.execute(ddl.replace(f'CREATE TABLE {table.name} ', f'CREATE TABLE {table.name}__new ', 1))
+    raw.execute(f'INSERT INTO {table.name}__new ({columns}) SELECT {columns} FROM {table.name}')
+    # Sin claves foráneas activas pudieron quedar huérfanos: se aplica la regla ON DELETE
+    for constraint in table.foreign_key_constraints:
+        element = next(iter(constraint.elements))
+        column, target = element.parent.name, element.column
+        orphan = (f'{column} IS NOT NULL AND {column} NOT IN '
+                  f'(SELECT {target.name} FROM {target.table.name})')
+        if constraint.ondelete == 'SET NULL':
+            raw.execute(f'UPDATE {table.name}__new SET {column} = NULL WHERE {orphan}')
+        else:
+            raw.execute(f'DELETE FROM {table.name}__new WHERE {orphan}')
+    raw.execute(f'DROP TABLE {table.name}')
+    raw.execute(f'ALTER TABLE {table.name}__new RENAME TO {table.name}')
+    for index in table.indexes:
+        raw.execute(
+            f"CREATE INDEX IF NOT EXISTS {index.name} ON {table.name} "
+            f"({', '.join(column.name for column in index.columns)})"
+        )
+
+
+def _foreign_key_cascades():
+    """ON DELETE CASCADE / SET NULL en las claves foráneas hacia users y projects."""
+    pending = [(model.__table__, _outdated_foreign_keys(model.__table__)) for model in CASCADE_TABLES]
+    pending = [(table, outdated) for table, outdated in pending if outdated]
+    if not pending:
+        return
+    if db.engine.dialect.name == 'postgresql':
+        for table, outdated in pending:
+            _alter_foreign_keys_postgres(table, outdated)
+        return
+    raw = db.engine.raw_connection()
+    try:
+        driver = raw.driver_connection
+        isolation_level = driver.isolation_level
+        driver.isolation_level = None  # BEGIN/COMMIT explícitos, también para el DDL
+        driver.execute('PRAGMA foreign_keys=OFF')
+        driver.execute('BEGIN')
+        try:
+            for table, _ in pending:
+                _rebuild_sqlite_table(driver, table)
+            violations = driver.execute('PRAGMA foreign_key_check').fetchall()
+            if violations:
+                raise RuntimeError(f'Claves foráneas rotas tras recrear las tablas: {violations[:5]}')
+            driver.execute('COMMIT')
+        except Exception:
+            driver.execute('ROLLBACK')
+            raise
+        finally:
+            driver.execute('PRAGMA foreign_keys=ON')
+            driver.isolation_level = isolation_level
+    finally:
+        raw.close()
+
+
+def _user_deletions_table():
+    UserDeletion.__table__.create(db.engine, checkfirst=True)
+
+
+def _jobs_table():
+    Job.__table__.create(db.engine, checkfirst=True)
+
+
+def _job_checkpoints():
+    _add_column('jobs', 'checkpoint', 'TEXT')
+
+
+MIGRATIONS = [
+    (1, 'Esquema inicial', _initial_schema),
+    (2, 'Índices de búsqueda de usuarios', _search_indexes),
+    (3, 'Índices compuestos de tareas, proyectos, tickets y documentos', _hot_indexes),
+    (4, 'Columna updated_at en tareas y proyectos', _add_updated_at),
+    (5, 'ON DELETE CASCADE/SET NULL en claves foráneas', _foreign_key_cascades),
+    (6, 'Tabla de progreso de eliminaciones de usuarios', _user_deletions_table),
+    (7, 'Tabla de trabajos en segundo plano', _jobs_table),
+    (8, 'Punto de control de los trabajos', _job_checkpoints),
+]
+
+
+def _ensure_version_table():
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            'version INTEGER PRIMARY KEY, description VARCHAR(200), applied_at TIMESTAMP)'
+        ))
+
+
+def current_version():
+    """Devuelve la versión de esquema aplicada (0 si no hay ninguna)."""
+    _ensure_version_table()
+    with db.engine.connect() as conn:
+        return conn.execute(text('SELECT COALESCE(MAX(version), 0) FROM schema_migrations')).scalar()
+
+
+def _run_pending(log):
+    applied = current_version()
+    for version, description, migrate in MIGRATIONS:
+        if version <= applied:
+            continue
+        log(f"Aplicando migración {version}: {description}...")
+        migrate()
+        with db.engine.begin() as conn:
+            conn.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)'),
+                {'v': version, 'd': description, 't': datetime.utcnow()},
+            )
+    return current_version()
+
+
+def run_migrations(log=print):
+    """Aplica las migraciones pendientes. Debe llamarse dentro de un app_context."""
+    _ensure_version_table()
+    if db.engine.dialect.name != 'postgresql':
+        return _run_pending(log)
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as lock_conn:
+        lock_conn.execute(text('SELECT pg_advisory_lock(:id)'), {'id': MIGRATIONS_LOCK_ID})
+        try:
+            return _run_pending(log)
+        finally:
+            lock_conn.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': MIGRATIONS_LOCK_ID})
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        if '--status' in sys.argv:
+            print(f"Versión de esquema: {current_version()} (última: {MIGRATIONS[-1][0]})")
+        else:
+            print(f"✓ Esquema en la versión {run_migrations()}")
@@ -1,9 +1,20 @@
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 db = SQLAlchemy()
 
+
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite solo aplica las claves foráneas (y sus ON DELETE) si se activan en cada conexión
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
+
 class User(UserMixin, db.Model):
     """Modelo de Usuario para la base de datos."""
     __tablename__ = 'users'
@@ -18,9 +29,9 @@ class User(UserMixin, db.Model):
     encrypted_note = db.Column(db.Text)  # Campo para datos sensibles cifrados
     
     # Relaciones
-    tasks_assigned = db.relationship('Task', foreign_keys='Task.assigned_to', backref='assignee', lazy=True, cascade="all, delete-orphan")
-    projects = db.relationship('Project', backref='client', lazy=True, cascade="all, delete-orphan")
-    tickets = db.relationship('SupportTicket', backref='client', lazy=True, cascade="all, delete-orphan")
+    tasks_assigned = db.relationship('Task', foreign_keys='Task.assigned_to', backref='assignee', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    projects = db.relationship('Project', backref='client', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    tickets = db.relationship('SupportTicket', backref='client', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -29,17 +40,23 @@ class User(UserMixin, db.Model):
 class Task(db.Model):
     """Modelo de Tareas para empleados."""
     __tablename__ = 'tasks'
+    __table_args__ = (
+        db.Index('ix_tasks_assigned_status', 'assigned_to', 'status'),
+        db.Index('ix_tasks_assigned_due_date', 'assigned_to', 'due_date'),
+        db.Index('ix_tasks_project_id', 'project_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     status = db.Column(db.String(20), default='pendiente')  # pendiente, en_proceso, completada
     priority = db.Column(db.String(20), default='media')  # baja, media, alta
-    assigned_to = db.Column(db.Integer, db.ForeignKey('users.id'))
+    assigned_to = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     due_date = db.Column(db.DateTime)
     completed_at = db.Column(db.DateTime)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'))
+    updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'))
 
     def __repr__(self):
         return f'<Task {self.title}>'
@@ -48,18 +65,22 @@ class Task(db.Model):
 class Project(db.Model):
     """Modelo de Proyectos."""
     __tablename__ = 'projects'
+    __table_args__ = (
+        db.Index('ix_projects_client_status', 'client_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     status = db.Column(db.String(20), default='activo')  # activo, completado, cancelado
     progress = db.Column(db.Integer, default=0)  # 0-100
-    client_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    client_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     deadline = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
     
     # Relaciones
-    tasks = db.relationship('Task', backref='project', lazy=True, cascade="all, delete-orphan")
+    tasks = db.relationship('Task', backref='project', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f'<Project {self.name}>'
@@ -68,13 +89,17 @@ class Project(db.Model):
 class SupportTicket(db.Model):
     """Modelo de Tickets de Soporte para clientes."""
     __tablename__ = 'support_tickets'
+    __table_args__ = (
+        db.Index('ix_tickets_client_status', 'client_id', 'status'),
+        db.Index('ix_tickets_client_created_at', 'client_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     subject = db.Column(db.String(200), nullable=False)
     message = db.Column(db.Text, nullable=False)
     status = db.Column(db.String(20), default='abierto')  # abierto, en_proceso, resuelto
     priority = db.Column(db.String(20), default='normal')  # baja, normal, alta, urgente
-    client_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
 
@@ -85,18 +110,63 @@ class SupportTicket(db.Model):
 class Document(db.Model):
     """Modelo de Documentos para clientes (Uso Seguro)."""
     __tablename__ = 'documents'
+    __table_args__ = (
+        db.Index('ix_documents_client_id', 'client_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     file_type = db.Column(db.String(50))  # factura, contrato, reporte, etc.
-    client_id = db.Column(db.Integer, db.ForeignKey('users.id'))
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'))
+    client_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'))
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='SET NULL'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
         return f'<Document {self.title}>'
 
 
+class UserDeletion(db.Model):
+    """Progreso de la eliminación en segundo plano de cuentas con muchos datos."""
+    __tablename__ = 'user_deletions'
+
+    # Sin clave foránea: el registro debe sobrevivir al usuario eliminado
+    user_id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), nullable=False)
+    status = db.Column(db.String(20), default='pendiente')  # pendiente, en_proceso, completada, error
+    total_rows = db.Column(db.Integer, default=0)
+    deleted_rows = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    def __repr__(self):
+        return f'<UserDeletion {self.username} {self.status}>'
 
+
+class Job(db.Model):
+    """Trabajo en segundo plano persistente (ver jobs.py)."""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text)  # JSON
+    status = db.Column(db.String(20), default='pendiente')  # pendiente, en_proceso, completado, error
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    progress = db.Column(db.Integer, default=0)  # 0-100
+    result = db.Column(db.Text)  # JSON
+    checkpoint = db.Column(db.Text)  # JSON: dónde reanudar tras un fallo
+    error = db.Column(db.Text)
+    created_by = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
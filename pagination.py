@@ -0,0 +1,101 @@
+"""
+Paginación por keyset compartida por los endpoints JSON de listas.
+
+El cursor es opaco para el cliente: codifica en base64 la última clave de
+orden y el id de la última fila entregada. La siguiente página se obtiene con
+`WHERE (orden, id) > (cursor)` en lugar de OFFSET, por lo que el coste no
+crece con el número de página. Las claves nulas se ordenan al final.
+
+Un cursor malformado lanza `InvalidCursor` (la aplicación responde 400) en vez
+de volver a la primera página: un cliente que sigue `next_cursor` en bucle
+leería esa página una y otra vez.
+"""
+import base64
+import binascii
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', '50'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '200'))
+
+
+class InvalidCursor(ValueError):
+    """El cursor de paginación no se puede decodificar."""
+
+
+def clamp_page_size(raw, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Convierte el parámetro `limit` en un tamaño de página válido."""
+    try:
+        size = int(raw)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and '$dt' in value:
+        return datetime.fromisoformat(value['$dt'])
+    return value
+
+
+def encode_cursor(sort_value, row_id):
+    """Codifica (clave de orden, id) en un cursor opaco."""
+    raw = json.dumps([_encode_value(sort_value), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodifica un cursor; devuelve None si está vacío y lanza InvalidCursor si está malformado."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return _decode_value(sort_value), int(row_id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor(f'Cursor de paginación no válido: {cursor[:40]}') from e
+
+
+def _after(sort_col, id_col, sort_value, row_id, descending):
+    """Condición keyset para las filas posteriores al cursor (nulos al final)."""
+    id_after = id_col < row_id if descending else id_col > row_id
+    if sort_col is None:
+        return id_after
+    if sort_value is None:
+        return and_(sort_col.is_(None), id_after)
+    sort_after = sort_col < sort_value if descending else sort_col > sort_value
+    return or_(sort_after, and_(sort_col == sort_value, id_after), sort_col.is_(None))
+
+
+def paginate(session, stmt, id_col, sort_col=None, cursor=None, limit=None, descending=False):
+    """
+    Ejecuta `stmt` paginado por (sort_col, id_col).
+    Devuelve (filas, next_cursor); `next_cursor` es None en la última página.
+    """
+    page_size = clamp_page_size(limit)
+    position = decode_cursor(cursor)
+    if position is not None:
+        stmt = stmt.where(_after(sort_col, id_col, *position, descending))
+
+    order = []
+    if sort_col is not None:
+        order.append((sort_col.desc() if descending else sort_col.asc()).nulls_last())
+    order.append(id_col.desc() if descending else id_col.asc())
+
+    rows = session.execute(stmt.order_by(*order).limit(page_size + 1)).all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]._mapping
+        sort_value = last[sort_col.key] if sort_col is not None else None
+        next_cursor = encode_cursor(sort_value, last[id_col.key])
+    return rows, next_cursor
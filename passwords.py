@@ -0,0 +1,174 @@
+"""
+Servicio de hashing de contraseñas sobre un pool de procesos acotado.
+
+Los KDF de contraseñas son lentos a propósito; ejecutarlos en el hilo de la
+petición bloquea el worker de gunicorn durante toda la derivación. Aquí se
+delegan a un ProcessPoolExecutor con un límite de trabajos en cola: si se
+supera, se lanza `HashingBusy` y la ruta responde de forma controlada en lugar
+de dejar sin workers al resto de dashboards.
+
+Variables de entorno:
+    PASSWORD_HASH_METHOD      Método de werkzeug (por defecto pbkdf2:sha256:600000).
+                              La columna password_hash admite 120 caracteres,
+                              suficiente para pbkdf2 pero no para scrypt.
+    PASSWORD_HASH_WORKERS     Procesos del pool (0 = hashing en línea).
+    PASSWORD_HASH_MAX_QUEUE   Trabajos simultáneos admitidos (en curso + en cola).
+    PASSWORD_HASH_TIMEOUT     Segundos máximos de espera por resultado.
+    PASSWORD_IMPORT_WORKERS   Procesos para el hashing masivo de importaciones
+                              (por defecto, las CPUs disponibles).
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from itertools import repeat
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from instrumentation import timed_crypto
+from metrics import KDF_DURATION
+from server_config import PASSWORD_HASH_WORKERS, available_cpus
+
+try:
+    from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS
+except ImportError:
+    DEFAULT_PBKDF2_ITERATIONS = 600000
+
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2')
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', '32'))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', '10'))
+PASSWORD_IMPORT_WORKERS = int(os.environ.get('PASSWORD_IMPORT_WORKERS', '0')) or available_cpus()
+
+
+class HashingBusy(Exception):
+    """El pool de hashing tiene la cola llena o no respondió a tiempo."""
+
+
+def normalize_method(method):
+    """Expande un método de werkzeug a su forma completa con parámetros."""
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2':
+        digest = parts[1] if len(parts) > 1 else 'sha256'
+        iterations = parts[2] if len(parts) > 2 else str(DEFAULT_PBKDF2_ITERATIONS)
+        return f'pbkdf2:{digest}:{iterations}'
+    if parts[0] == 'scrypt':
+        given = parts[1:4]
+        n, r, p = given + ['32768', '8', '1'][len(given):]
+        return f'scrypt:{n}:{r}:{p}'
+    return method
+
+
+def needs_rehash(stored_hash, method=PASSWORD_HASH_METHOD):
+    """Indica si el hash almacenado usa parámetros distintos a los configurados."""
+    stored_method = stored_hash.split('$', 1)[0]
+    return normalize_method(stored_method) != normalize_method(method)
+
+
+class PasswordHasher:
+    """Verifica y genera hashes en un pool de procesos con cola acotada."""
+
+    def __init__(self, method=PASSWORD_HASH_METHOD, workers=PASSWORD_HASH_WORKERS,
+                 max_queue=PASSWORD_HASH_MAX_QUEUE, timeout=PASSWORD_HASH_TIMEOUT):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # El pool se crea tras el fork de gunicorn, uno por worker
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def _run(self, fn, *args):
+        operation = 'verify' if fn is check_password_hash else 'hash'
+        with timed_crypto(), KDF_DURATION.labels(operation=operation).time():
+            return self._submit(fn, *args)
+
+    def _submit(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # El hueco se libera cuando termina el KDF, no cuando deja de esperarse:
+        # tras un timeout la tarea sigue ocupando un proceso del pool
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Si aún no había empezado, se descarta y el hueco queda libre ya
+            future.cancel()
+            raise HashingBusy()
+
+    def hash(self, password):
+        """Genera el hash de una contraseña con el método configurado."""
+        return self._run(generate_password_hash, password, self.method)
+
+    def bulk(self, workers=PASSWORD_IMPORT_WORKERS):
+        """
+        Hashing masivo para una importación (`with hasher.bulk() as bulk:`).
+        Usa un pool propio para no encolar los logins detrás de la importación.
+        """
+        return BulkHashing(self.method, workers)
+
+    def verify(self, stored_hash, password):
+        """Comprueba una contraseña contra su hash almacenado."""
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        return needs_rehash(stored_hash, self.method)
+
+    def shutdown(self):
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+
+class BulkHashing:
+    """
+    Pool de procesos de una importación completa: se crea con el primer lote
+    que trae contraseñas (las importaciones sin contraseñas no lanzan
+    procesos) y se cierra al salir del bloque `with`.
+    """
+
+    def __init__(self, method, workers):
+        self.method = method
+        self.workers = workers
+        self._pool = None
+
+    def hash_many(self, passwords):
+        """Hashea un lote de contraseñas en paralelo, en el orden recibido."""
+        passwords = list(passwords)
+        if not passwords:
+            return []
+        with timed_crypto(), KDF_DURATION.labels(operation='hash_many').time():
+            if self.workers <= 1 or len(passwords) == 1:
+                return [generate_password_hash(password, self.method) for password in passwords]
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            chunksize = max(1, len(passwords) // (self.workers * 4))
+            return list(self._pool.map(generate_password_hash, passwords, repeat(self.method), chunksize=chunksize))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,173 @@
+"""
+Almacenamiento compartido para Flask-Limiter respaldado por SQLite.
+
+Con `memory://` cada worker de gunicorn lleva sus propios contadores, de modo
+que el límite efectivo se multiplica por el número de workers y se reinicia al
+reciclar un worker. Este backend guarda los contadores en un fichero SQLite
+(por defecto en /dev/shm, es decir, en memoria compartida del host) que todos
+los workers del mismo host comparten, sin ningún salto de red.
+
+Implementa la estrategia `sliding-window-counter` de `limits`: dos contadores
+por ventana (anterior y actual) ponderados, con coste O(1) por petición. Cada
+adquisición se hace dentro de una transacción `BEGIN IMMEDIATE`, por lo que es
+atómica entre procesos.
+
+Importar este módulo registra el esquema `sqlite://` en `limits`.
+Ejemplo: `sqlite:////dev/shm/ratelimit.db`.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from math import floor
+
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+
+PURGE_EVERY = 1000
+
+
+def default_storage_uri():
+    """URI por defecto: fichero en memoria compartida si existe /dev/shm."""
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return f"sqlite:///{os.path.join(directory, 'proyecto_ratelimit.db')}"
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Contadores de límite de peticiones compartidos entre procesos vía SQLite."""
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        # Misma convención que SQLAlchemy: sqlite:///relativo, sqlite:////absoluto
+        path = (uri or default_storage_uri()).split('://', 1)[1]
+        self.path = path[1:] if path.startswith('/') else path
+        self.timeout = float(options.get('timeout', 5.0))
+        self._local = threading.local()
+        self._hits = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        with self._transaction() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS counters ('
+                'key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL'
+                ') WITHOUT ROWID'
+            )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        # Una conexión por hilo y por proceso (se reabre tras el fork de gunicorn)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    @staticmethod
+    def _get(conn, key, now):
+        row = conn.execute(
+            'SELECT value FROM counters WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _incr(conn, key, expiry, amount, now):
+        conn.execute(
+            'INSERT INTO counters (key, value, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET '
+            'value = CASE WHEN expires_at <= ? THEN excluded.value ELSE value + excluded.value END, '
+            'expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END',
+            (key, amount, now + expiry, now, now),
+        )
+        return SQLiteStorage._get(conn, key, now)
+
+    def _maybe_purge(self, conn, now):
+        self._hits += 1
+        if self._hits % PURGE_EVERY == 0:
+            conn.execute('DELETE FROM counters WHERE expires_at <= ?', (now,))
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        with self._transaction() as conn:
+            self._maybe_purge(conn, now)
+            return self._incr(conn, key, expiry, amount, now)
+
+    def get(self, key):
+        return self._get(self._connection(), key, time.time())
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT expires_at FROM counters WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        with self._transaction() as conn:
+            return conn.execute('DELETE FROM counters').rowcount
+
+    def clear(self, key):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM counters WHERE key = ?', (key,))
+
+    # Ventana deslizante (sliding-window-counter)
+
+    def _window_info(self, conn, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(conn, previous_key, now)
+        current_count = self._get(conn, current_key, now)
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        with self._transaction() as conn:
+            self._maybe_purge(conn, now)
+            previous_count, previous_ttl, current_count, _ = self._window_info(conn, key, expiry, now)
+            if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                return False
+            _, current_key = self.sliding_window_keys(key, expiry, now)
+            self._incr(conn, current_key, 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(self, key, expiry):
+        return self._window_info(self._connection(), key, expiry, time.time())
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM counters WHERE key IN (?, ?)', (previous_key, current_key))
+
+
+class _Transaction:
+    """Transacción de escritura exclusiva (`BEGIN IMMEDIATE`) sobre una conexión."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
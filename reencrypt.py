@@ -0,0 +1,133 @@
+"""
+Re-cifrado de `User.encrypted_note` tras rotar SECRET_KEY o SECURITY_SALT.
+
+Recorre los usuarios por lotes de clave primaria (`WHERE id > :ultimo ORDER BY
+id LIMIT :lote`), descifra con cualquier clave del anillo (las retiradas se
+configuran en OLD_SECRET_KEYS / OLD_SECURITY_SALTS y se derivan una sola vez)
+y cifra con la actual. Cada lote se escribe con un UPDATE ejecutado como
+executemany y se confirma por separado, de modo que no hay transacciones
+largas ni se carga la tabla en memoria. El último id procesado es el punto de
+control desde el que se reanuda.
+
+La escritura es optimista (`WHERE encrypted_note = <token leído>`): si el
+usuario cambió su nota entre la lectura y la escritura, se conserva la nota
+nueva, que ya está cifrada con la clave actual, y la fila cuenta como
+`skipped`. El rowcount de un executemany no es fiable (con psycopg2 es el de la
+última sentencia o -1), así que las filas escritas se cuentan releyendo el
+lote antes del commit.
+
+Uso:
+    python reencrypt.py                      # en primer plano
+    python reencrypt.py --start-after 123456 # reanuda tras ese id
+    POST /admin/reencrypt                    # como trabajo en segundo plano
+"""
+import os
+import sys
+import time
+
+from cryptography.fernet import InvalidToken
+from sqlalchemy import bindparam, func
+
+from jobs import job_handler
+from models import db, User
+
+REENCRYPT_BATCH_SIZE = int(os.environ.get('REENCRYPT_BATCH_SIZE', '1000'))
+REENCRYPT_PAUSE = float(os.environ.get('REENCRYPT_PAUSE', '0'))
+
+_users = User.__table__
+_update_note = (
+    _users.update()
+    .where(_users.c.id == bindparam('b_id'), _users.c.encrypted_note == bindparam('b_old'))
+    .values(encrypted_note=bindparam('b_new'))
+)
+
+
+def reencrypt_batch(keyring, rows):
+    """Devuelve (cambios para el UPDATE, ya al día, ilegibles) de un lote de (id, token)."""
+    changes, current, unreadable = [], 0, 0
+    for user_id, token in rows:
+        if keyring.is_current(token):
+            current += 1
+            continue
+        try:
+            changes.append({'b_id': user_id, 'b_old': token, 'b_new': keyring.rotate(token)})
+        except InvalidToken:
+            unreadable += 1
+    return changes, current, unreadable
+
+
+def _apply_changes(changes):
+    """Escribe un lote de cambios; devuelve (re-cifradas, omitidas por conflicto)."""
+    db.session.execute(_update_note, changes)
+    written = dict(db.session.execute(
+        db.select(User.id, User.encrypted_note).where(User.id.in_([c['b_id'] for c in changes]))
+    ).all())
+    rotated = sum(1 for c in changes if written.get(c['b_id']) == c['b_new'])
+    return rotated, len(changes) - rotated
+
+
+def reencrypt_notes(keyring, start_after=0, batch_size=REENCRYPT_BATCH_SIZE, pause=REENCRYPT_PAUSE,
+                    on_batch=None):
+    """
+    Re-cifra todas las notas con id > start_after. `on_batch(stats)` se llama
+    tras confirmar cada lote con el último id procesado en `stats['last_id']`.
+    """
+    max_id = db.session.execute(db.select(func.max(User.id))).scalar() or 0
+    stats = {'last_id': start_after, 'max_id': max_id, 'rotated': 0, 'skipped': 0, 'current': 0,
+             'unreadable': 0}
+    while True:
+        rows = db.session.execute(
+            db.select(User.id, User.encrypted_note)
+            .where(User.id > stats['last_id'], User.encrypted_note.isnot(None))
+            .order_by(User.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        changes, current, unreadable = reencrypt_batch(keyring, rows)
+        if changes:
+            rotated, skipped = _apply_changes(changes)
+            stats['rotated'] += rotated
+            stats['skipped'] += skipped
+        db.session.commit()
+        stats['current'] += current
+        stats['unreadable'] += unreadable
+        stats['last_id'] = rows[-1].id
+        if on_batch is not None:
+            on_batch(stats)
+        if pause:
+            time.sleep(pause)
+    db.session.commit()
+    return stats
+
+
+@job_handler('reencrypt_notes')
+def _reencrypt_notes_job(ctx):
+    from app import SECRET_KEY, SECURE_SALT
+    from crypto_keys import get_keyring
+
+    start_after = (ctx.checkpoint or {}).get('last_id', ctx.payload.get('start_after', 0))
+
+    def checkpoint(stats):
+        ctx.progress(stats['last_id'], stats['max_id'], checkpoint={'last_id': stats['last_id']})
+
+    return reencrypt_notes(get_keyring(SECRET_KEY, SECURE_SALT), start_after=start_after, on_batch=checkpoint)
+
+
+if __name__ == '__main__':
+    from app import app, SECRET_KEY, SECURE_SALT
+    from crypto_keys import get_keyring
+
+    start = int(sys.argv[sys.argv.index('--start-after') + 1]) if '--start-after' in sys.argv else 0
+    began = time.perf_counter()
+
+    def report(stats):
+        rate = stats['rotated'] / max(time.perf_counter() - began, 1e-6)
+        print(f"id {stats['last_id']}/{stats['max_id']}: {stats['rotated']} re-cifradas, "
+              f"{stats['skipped']} cambiadas entretanto, {stats['unreadable']} ilegibles ({rate:.0f}/s)")
+
+    with app.app_context():
+        result = reencrypt_notes(get_keyring(SECRET_KEY, SECURE_SALT), start_after=start, on_batch=report)
+    print(f"✓ Re-cifrado terminado: {result}")
+    if result['unreadable']:
+        print("⚠ Hay notas que ninguna clave del anillo descifra: revisa OLD_SECRET_KEYS / OLD_SECURITY_SALTS")
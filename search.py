@@ -0,0 +1,132 @@
+"""
+Búsqueda indexada y paginada de usuarios para el panel de administración.
+
+- PostgreSQL: índices GIN con pg_trgm sobre username/email, de modo que
+  `ILIKE '%q%'` usa índice, más un índice `text_pattern_ops` para prefijos.
+- SQLite: tabla virtual FTS5 con tokenizador trigram mantenida por triggers.
+- Consultas de menos de 3 caracteres usan la ruta rápida por prefijo.
+
+Los resultados se paginan por keyset (id descendente, el mismo orden que la
+lista del panel, ver pagination.py) con un tamaño de página acotado por
+SEARCH_MAX_PAGE_SIZE.
+"""
+import os
+
+from sqlalchemy import text
+
+from models import db, User
+from pagination import clamp_page_size, paginate
+
+SEARCH_DEFAULT_PAGE_SIZE = int(os.environ.get('SEARCH_DEFAULT_PAGE_SIZE', '25'))
+SEARCH_MAX_PAGE_SIZE = int(os.environ.get('SEARCH_MAX_PAGE_SIZE', '100'))
+TRIGRAM_MIN_LENGTH = 3
+
+# (nombre, definición) de los índices de users en PostgreSQL. Los crea
+# `ensure_search_indexes` con la función que recibe de migrations.py, que usa
+# CONCURRENTLY para no bloquear las escrituras en users durante la creación.
+POSTGRES_INDEXES = [
+    ('ix_users_username_trgm', 'USING gin (username gin_trgm_ops)'),
+    ('ix_users_email_trgm', 'USING gin (email gin_trgm_ops)'),
+    ('ix_users_username_lower_prefix', '(lower(username) text_pattern_ops)'),
+    ('ix_users_email_lower_prefix', '(lower(email) text_pattern_ops)'),
+]
+
+_SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "username, email, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, username, email) VALUES (new.id, new.username, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, username, email) VALUES ('delete', old.id, old.username, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, username, email) VALUES ('delete', old.id, old.username, old.email); "
+    "INSERT INTO users_fts(rowid, username, email) VALUES (new.id, new.username, new.email); END",
+]
+
+_fts_available = None
+
+
+def _dialect():
+    return db.engine.dialect.name
+
+
+def ensure_search_indexes(create_index):
+    """
+    Crea los índices de búsqueda propios del motor (idempotente).
+    `create_index(nombre, tabla, definición)` crea cada índice de PostgreSQL
+    (ver `migrations._create_index_online`). Los errores
+    se propagan: la migración que lo llama no queda registrada y se reintenta
+    en el siguiente arranque en lugar de quedarse para siempre en la ruta lenta.
+    """
+    global _fts_available
+    dialect = _dialect()
+    if dialect == 'postgresql':
+        with db.engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for name, definition in POSTGRES_INDEXES:
+            create_index(name, 'users', definition)
+    elif dialect == 'sqlite':
+        _fts_available = None
+        with db.engine.begin() as conn:
+            created = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'users_fts'"
+            )).first() is None
+            for ddl in _SQLITE_DDL:
+                conn.execute(text(ddl))
+            if created:
+                conn.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+        _fts_available = True
+
+
+def _sqlite_fts_available():
+    global _fts_available
+    if _fts_available is None:
+        with db.engine.connect() as conn:
+            _fts_available = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'users_fts'"
+            )).first() is not None
+    return _fts_available
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _text_filter(query):
+    """Construye el filtro de texto más barato disponible para `query`."""
+    needle = _escape_like(query.lower())
+    if len(query) < TRIGRAM_MIN_LENGTH:
+        # Ruta rápida por prefijo: rango sobre índice B-tree
+        prefix = f'{needle}%'
+        return db.or_(
+            db.func.lower(User.username).like(prefix, escape='\\'),
+            db.func.lower(User.email).like(prefix, escape='\\'),
+        )
+    if _dialect() == 'sqlite' and _sqlite_fts_available():
+        match = '"' + query.replace('"', '""') + '"'
+        return User.id.in_(
+            text("SELECT rowid FROM users_fts WHERE users_fts MATCH :match").bindparams(match=match)
+        )
+    pattern = f'%{needle}%'
+    return db.or_(
+        User.username.ilike(pattern, escape='\\'),
+        User.email.ilike(pattern, escape='\\'),
+    )
+
+
+def search_users(query='', role='', cursor=None, limit=None):
+    """
+    Busca usuarios por nombre o email con paginación por keyset, de más
+    recientes a más antiguos; sin `query` ni `role` es la lista del panel.
+    Devuelve (filas, next_cursor); `next_cursor` es None en la última página.
+    """
+    stmt = db.select(User.id, User.username, User.email, User.role, User.created_at)
+
+    query = (query or '').strip()
+    if query:
+        stmt = stmt.where(_text_filter(query))
+    if role:
+        stmt = stmt.where(User.role == role)
+
+    page_size = clamp_page_size(limit, SEARCH_DEFAULT_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE)
+    return paginate(db.session, stmt, User.id, cursor=cursor, limit=page_size, descending=True)
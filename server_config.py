@@ -0,0 +1,133 @@
+"""
+Dimensionado de gunicorn y del pool de SQLAlchemy.
+
+Los valores se derivan de las CPUs y la memoria disponibles para el contenedor
+(cgroups v2/v1, con /proc/meminfo como respaldo) y pueden fijarse con
+variables de entorno. gunicorn.conf.py y app.py usan las mismas funciones, de
+modo que el pool de conexiones siempre cubre los hilos de cada worker.
+
+Variables de entorno:
+    WEB_WORKERS, WEB_THREADS, WEB_TIMEOUT, WEB_MAX_REQUESTS
+    WORKER_MEMORY_MB        Memoria estimada por worker (por defecto 80).
+    HASH_PROCESS_MEMORY_MB  Memoria estimada por proceso del pool de hashing
+                            (por defecto 30); cada worker tiene
+                            PASSWORD_HASH_WORKERS procesos (por defecto 2).
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT
+    DB_STATEMENT_TIMEOUT_MS Límite por sentencia en PostgreSQL (0 = sin límite).
+                            No se aplica a migraciones ni a la carga de datos
+                            (ver `disable_statement_timeout`).
+"""
+import logging
+import os
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+RESERVED_MEMORY_MB = 64
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+# Procesos del pool de hashing de cada worker (ver passwords.py)
+PASSWORD_HASH_WORKERS = _env_int('PASSWORD_HASH_WORKERS', 2)
+
+
+def _read_first_line(path):
+    try:
+        with open(path) as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def available_cpus():
+    """CPUs utilizables, respetando la cuota de cgroups si existe."""
+    quota = _read_first_line('/sys/fs/cgroup/cpu.max')
+    if quota:
+        limit, period = quota.split()
+        if limit != 'max':
+            return max(1, int(int(limit) / int(period)))
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def available_memory_mb():
+    """Memoria disponible en MB (límite del contenedor o memoria total)."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        value = _read_first_line(path)
+        if value and value != 'max' and int(value) < 1 << 50:
+            return int(value) // (1024 * 1024)
+    meminfo = _read_first_line('/proc/meminfo')
+    if meminfo and meminfo.startswith('MemTotal:'):
+        return int(meminfo.split()[1]) // 1024
+    return 512
+
+
+def gunicorn_settings():
+    """Workers e hilos de gunicorn según CPU y memoria."""
+    cpus = available_cpus()
+    memory = available_memory_mb()
+    # Cada worker arrastra su pool de procesos de hashing
+    per_worker = (_env_int('WORKER_MEMORY_MB', 80)
+                  + max(0, PASSWORD_HASH_WORKERS) * _env_int('HASH_PROCESS_MEMORY_MB', 30))
+    by_memory = max(1, (memory - RESERVED_MEMORY_MB) // per_worker)
+    workers = _env_int('WEB_WORKERS', max(1, min(2 * cpus + 1, by_memory)))
+    return {
+        'cpus': cpus,
+        'memory_mb': memory,
+        'memory_per_worker_mb': per_worker,
+        'workers': workers,
+        'threads': _env_int('WEB_THREADS', 4),
+        'timeout': _env_int('WEB_TIMEOUT', 30),
+        'max_requests': _env_int('WEB_MAX_REQUESTS', 2000),
+    }
+
+
+def engine_options(database_uri, threads=None):
+    """Opciones de create_engine: un pool por worker dimensionado a sus hilos."""
+    if threads is None:
+        threads = gunicorn_settings()['threads']
+    options = {
+        'pool_pre_ping': True,
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+    }
+    if database_uri.startswith('sqlite'):
+        return options
+    options.update({
+        'pool_size': _env_int('DB_POOL_SIZE', threads),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', max(2, threads // 2)),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 10),
+    })
+    statement_timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', 15000)
+    if database_uri.startswith('postgresql') and statement_timeout:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
+def disable_statement_timeout(engine):
+    """
+    Quita DB_STATEMENT_TIMEOUT_MS de las conexiones nuevas de `engine`. Para
+    procesos que no atienden peticiones (migraciones, carga de datos): un
+    CREATE INDEX CONCURRENTLY, un VALIDATE CONSTRAINT o la espera del bloqueo
+    de migraciones pueden durar más que cualquier petición.
+    """
+    if engine.dialect.name != 'postgresql':
+        return
+
+    @event.listens_for(engine, 'do_connect')
+    def _without_timeout(dialect, conn_rec, cargs, cparams):
+        cparams['options'] = '-c statement_timeout=0'
+
+    # Las conexiones ya abiertas llevan el límite: se descartan
+    engine.dispose()
+
+
+def log_settings(log=logger.info, **values):
+    """Registra la configuración efectiva en una sola línea."""
+    log('Configuración efectiva: ' + ', '.join(f'{k}={v}' for k, v in values.items()))
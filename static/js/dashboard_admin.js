@@ -0,0 +1,197 @@
+// Valores del servidor publicados en <meta> por la plantilla
+const CSRF_TOKEN = document.querySelector('meta[name="csrf-token"]').content;
+const LOGOUT_URL = document.querySelector('meta[name="logout-url"]').content;
+
+// Modal Functions
+const modal = document.getElementById('userModal');
+const editModal = document.getElementById('editUserModal');
+
+function openModal() {
+    modal.style.display = 'flex';
+}
+
+function closeModal() {
+    modal.style.display = 'none';
+}
+
+function openEditModal(id, username, email, role) {
+    document.getElementById('edit_username').value = username;
+    document.getElementById('edit_email').value = email;
+    document.getElementById('edit_role').value = role;
+    document.getElementById('editUserForm').action = "/admin/edit_user/" + id;
+    editModal.style.display = 'flex';
+}
+
+function openEditModalFromBtn(btn) {
+    const id = btn.getAttribute('data-id');
+    const username = btn.getAttribute('data-username');
+    const email = btn.getAttribute('data-email');
+    const role = btn.getAttribute('data-role');
+    openEditModal(id, username, email, role);
+}
+
+function closeEditModal() {
+    editModal.style.display = 'none';
+}
+
+window.onclick = function (event) {
+    if (event.target == modal) closeModal();
+    if (event.target == editModal) closeEditModal();
+}
+
+// Bulk Import
+async function importUsers(input) {
+    if (!input.files.length) return;
+    const formData = new FormData();
+    formData.append('file', input.files[0]);
+    formData.append('csrf_token', CSRF_TOKEN);
+    input.value = '';
+
+    try {
+        const response = await fetch('/admin/import_users', { method: 'POST', body: formData });
+        const data = await response.json();
+        if (!response.ok) {
+            alert(data.error || 'Error en la importación');
+            return;
+        }
+        const details = data.errors.slice(0, 10)
+            .map(e => `Línea ${e.line}: ${e.username || ''} ${e.error}`).join('\n');
+        alert(`Creados ${data.created} de ${data.total} usuarios. Errores: ${data.failed}` +
+            (details ? `\n\n${details}` : ''));
+        if (data.created) location.reload();
+    } catch (error) {
+        console.error('Error importing users:', error);
+    }
+}
+
+// Background Deletions Progress
+async function refreshDeletions() {
+    try {
+        const response = await fetch('/admin/deletions');
+        const data = await response.json();
+        const panel = document.getElementById('deletionsPanel');
+        const list = document.getElementById('deletionsList');
+        list.innerHTML = '';
+        panel.style.display = data.deletions.length ? 'block' : 'none';
+
+        data.deletions.forEach(d => {
+            const item = document.createElement('div');
+            item.style.cssText = 'padding: 12px; background: rgba(0,255,136,0.05); border-radius: 8px;';
+            const label = document.createElement('div');
+            label.style.cssText = 'display: flex; justify-content: space-between; margin-bottom: 8px;';
+            label.textContent = `${d.username} — ${d.status.replace('_', ' ')}`;
+            const count = document.createElement('strong');
+            count.textContent = d.error ? d.error : `${d.deleted_rows}/${d.total_rows} (${d.progress}%)`;
+            label.appendChild(count);
+            const bar = document.createElement('div');
+            bar.style.cssText = 'height: 6px; background: var(--border-color); border-radius: 3px;';
+            const fill = document.createElement('div');
+            fill.style.cssText = `height: 100%; width: ${d.progress}%; background: var(--accent-primary); border-radius: 3px;`;
+            bar.appendChild(fill);
+            item.append(label, bar);
+            list.appendChild(item);
+        });
+
+        if (data.deletions.some(d => d.status === 'pendiente' || d.status === 'en_proceso')) {
+            setTimeout(refreshDeletions, 3000);
+        }
+    } catch (error) {
+        console.error('Error loading deletions:', error);
+    }
+}
+document.addEventListener('DOMContentLoaded', refreshDeletions);
+
+// Search Function
+// Filtros y cursor de la última página mostrada ("Cargar más" continúa desde ahí)
+const userSearch = { query: '', role: '', cursor: null };
+
+document.addEventListener('DOMContentLoaded', () => {
+    userSearch.cursor = document.getElementById('usersTable').dataset.nextCursor || null;
+});
+
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value;
+    return div.innerHTML;
+}
+
+function userRow(user) {
+    const badgeClass = user.role === 'admin' ? 'badge-admin' : (user.role === 'empleado' ? 'badge-employee' : 'badge-client');
+    const roleLabel = user.role === 'admin' ? 'Admin' : (user.role === 'empleado' ? 'Empleado' : 'Cliente');
+
+    return `
+        <tr>
+            <td>${user.id}</td>
+            <td>${escapeHtml(user.username)}</td>
+            <td>${escapeHtml(user.email || 'N/A')}</td>
+            <td><span class="user-badge ${badgeClass}">${roleLabel}</span></td>
+            <td>${user.created_at || 'N/A'}</td>
+            <td>
+                <button class="icon-btn" data-id="${user.id}" data-username="${escapeHtml(user.username)}"
+                    data-email="${escapeHtml(user.email || '')}" data-role="${user.role}"
+                    onclick="openEditModalFromBtn(this)">Editar</button>
+                <form action="/admin/delete_user/${user.id}" method="POST" style="display:inline;" onsubmit="return confirm('¿Estás seguro?');">
+                    <input type="hidden" name="csrf_token" value="${CSRF_TOKEN}">
+                    <button type="submit" class="icon-btn" style="color: var(--accent-danger); border-color: var(--accent-danger);">Eliminar</button>
+                </form>
+            </td>
+        </tr>
+    `;
+}
+
+async function fetchUsers(append) {
+    const params = new URLSearchParams({ q: userSearch.query, role: userSearch.role });
+    if (append && userSearch.cursor) params.set('cursor', userSearch.cursor);
+
+    try {
+        const response = await fetch(`/admin/search?${params}`);
+        const data = await response.json();
+
+        const tbody = document.getElementById('usersTableBody');
+        const rows = data.users.map(userRow).join('');
+        if (append) {
+            tbody.insertAdjacentHTML('beforeend', rows);
+        } else {
+            tbody.innerHTML = rows;
+        }
+
+        userSearch.cursor = data.next_cursor;
+        document.getElementById('loadMoreUsers').style.display = data.next_cursor ? '' : 'none';
+    } catch (error) {
+        console.error('Error buscando usuarios:', error);
+    }
+}
+
+function searchUsers() {
+    userSearch.query = document.getElementById('searchInput').value;
+    userSearch.role = document.getElementById('roleFilter').value;
+    fetchUsers(false);
+}
+
+function loadMoreUsers() {
+    fetchUsers(true);
+}
+
+
+// Logout Function
+function logout() {
+    if (confirm('¿Está seguro que desea cerrar sesión?')) {
+        window.location.href = LOGOUT_URL;
+    }
+}
+
+// Auto-hide flash messages
+setTimeout(() => {
+    const flashMessages = document.querySelectorAll('.flash-message');
+    flashMessages.forEach(msg => {
+        msg.style.animation = 'slideOut 0.3s ease';
+        setTimeout(() => msg.remove(), 300);
+    });
+}, 5000);
+
+// Enter key search
+document.getElementById('searchInput').addEventListener('keypress', function (e) {
+    if (e.key === 'Enter') {
+        searchUsers();
+    }
+});
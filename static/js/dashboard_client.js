@@ -0,0 +1,75 @@
+// Valores del servidor publicados en <meta> por la plantilla
+const LOGOUT_URL = document.querySelector('meta[name="logout-url"]').content;
+
+function showSection(section, event) {
+    // Hide all sections
+    document.getElementById('overview-section').style.display = 'none';
+    document.getElementById('projects-section').style.display = 'none';
+    document.getElementById('documents-section').style.display = 'none';
+    document.getElementById('tickets-section').style.display = 'none';
+
+    // Show selected section
+    document.getElementById(section + '-section').style.display = 'block';
+
+    // Update active tab
+    document.querySelectorAll('.nav-tab').forEach(tab => tab.classList.remove('active'));
+    if (event) {
+        event.target.classList.add('active');
+    }
+}
+
+function openTicketModal() {
+    document.getElementById('ticketModal').style.display = 'flex';
+}
+
+function closeTicketModal() {
+    document.getElementById('ticketModal').style.display = 'none';
+}
+
+window.onclick = function (event) {
+    const modal = document.getElementById('ticketModal');
+    if (event.target == modal) {
+        closeTicketModal();
+    }
+}
+
+function logout() {
+    if (confirm('¿Cerrar sesión?')) {
+        window.location.href = LOGOUT_URL;
+    }
+}
+
+// Las páginas siguientes de documentos vuelven a la sección de documentos
+if (window.location.hash === '#documents') {
+    showSection('documents');
+}
+
+// Animation on load
+document.addEventListener('DOMContentLoaded', function () {
+    const cards = document.querySelectorAll('.card, .stat-card');
+    cards.forEach((card, index) => {
+        card.style.opacity = '0';
+        card.style.transform = 'translateY(20px)';
+        setTimeout(() => {
+            card.style.transition = 'all 0.5s ease';
+            card.style.opacity = '1';
+            card.style.transform = 'translateY(0)';
+        }, index * 50);
+    });
+});
+
+// Auto-hide flash messages
+setTimeout(() => {
+    const flashMessages = document.querySelectorAll('.flash-message');
+    flashMessages.forEach(msg => {
+        msg.style.animation = 'slideOutUp 0.4s ease forwards';
+        setTimeout(() => msg.remove(), 400);
+    });
+}, 5000);
+// Initialize progress bars
+document.querySelectorAll('.progress-fill').forEach(fill => {
+    const progress = fill.getAttribute('data-progress');
+    if (progress) {
+        fill.style.width = progress + '%';
+    }
+});
@@ -0,0 +1,168 @@
+// Valores del servidor publicados en <meta> por la plantilla
+const CSRF_TOKEN = document.querySelector('meta[name="csrf-token"]').content;
+const LOGOUT_URL = document.querySelector('meta[name="logout-url"]').content;
+
+function showSection(section, event) {
+    // Hide all sections
+    document.getElementById('dashboard-section').style.display = 'none';
+    document.getElementById('tasks-section').style.display = 'none';
+    document.getElementById('projects-section').style.display = 'none';
+    document.getElementById('stats-section').style.display = 'none';
+
+    // Show selected section
+    document.getElementById(section + '-section').style.display = 'block';
+
+    // Update active nav link
+    document.querySelectorAll('.nav-link').forEach(link => link.classList.remove('active'));
+    if (event) {
+        event.target.closest('.nav-link').classList.add('active');
+    }
+
+    // La lista completa se pide la primera vez que se abre la sección
+    if (section === 'tasks' && !taskList.loaded) {
+        fetchTasks(false);
+    }
+}
+
+// Lista paginada de /employee/tasks: filtro de estado y cursor de la última página
+const taskList = { status: '', cursor: null, loaded: false };
+
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value;
+    return div.innerHTML;
+}
+
+function formatDate(isoDate) {
+    if (!isoDate) return 'Sin fecha';
+    const [year, month, day] = isoDate.split('-');
+    return `${day}/${month}/${year}`;
+}
+
+function taskItem(task) {
+    const status = task.status || 'pendiente';
+    const priority = task.priority || 'media';
+    const priorityClass = priority === 'alta' ? 'high' : (priority === 'media' ? 'media' : 'low');
+    const statusLabel = status.replace('_', ' ');
+
+    return `
+        <div class="task-item task-status-${status}" data-id="${task.id}"
+            data-status="${status}" onclick="updateTaskStatusFromBtn(this)">
+            <div class="task-checkbox ${status === 'completada' ? 'completed' : ''}" id="check-${task.id}"></div>
+            <div class="task-content">
+                <div class="task-title">${escapeHtml(task.title)}</div>
+                <div style="font-size: 13px; color: var(--text-secondary); margin: 4px 0;">
+                    ${escapeHtml(task.description || '')}
+                </div>
+                <div class="task-meta">
+                    <span>Vence: ${formatDate(task.due_date)}</span>
+                    <span class="task-priority priority-${priorityClass}">
+                        ${priority.charAt(0).toUpperCase() + priority.slice(1)}
+                    </span>
+                    <span style="padding: 2px 8px; background: rgba(79, 70, 229, 0.1); color: var(--accent-primary); border-radius: 4px;">
+                        ${statusLabel.charAt(0).toUpperCase() + statusLabel.slice(1)}
+                    </span>
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+async function fetchTasks(append) {
+    const params = new URLSearchParams();
+    if (taskList.status) params.set('status', taskList.status);
+    if (append && taskList.cursor) params.set('cursor', taskList.cursor);
+
+    try {
+        const response = await fetch(`/employee/tasks?${params}`);
+        const data = await response.json();
+
+        const list = document.getElementById('tasksList');
+        const items = data.tasks.map(taskItem).join('');
+        if (append) {
+            list.insertAdjacentHTML('beforeend', items);
+        } else {
+            list.innerHTML = items || '<p style="color: var(--text-secondary);">No hay tareas.</p>';
+        }
+
+        taskList.cursor = data.next_cursor;
+        taskList.loaded = true;
+        document.getElementById('loadMoreTasks').style.display = data.next_cursor ? 'inline-block' : 'none';
+    } catch (error) {
+        console.error('Error loading tasks:', error);
+    }
+}
+
+function filterTasks(status, event) {
+    taskList.status = status === 'all' ? '' : status;
+    fetchTasks(false);
+
+    // Update active filter
+    document.querySelectorAll('.filter-tabs .filter-tab').forEach(tab => tab.classList.remove('active'));
+    if (event) {
+        event.target.classList.add('active');
+    }
+}
+
+function loadMoreTasks() {
+    fetchTasks(true);
+}
+
+async function updateTaskStatus(taskId, currentStatus) {
+    if (currentStatus === 'completada') {
+        return; // Already completed
+    }
+
+    const newStatus = currentStatus === 'pendiente' ? 'en_proceso' : 'completada';
+
+    try {
+        const formData = new FormData();
+        formData.append('status', newStatus);
+        formData.append('csrf_token', CSRF_TOKEN);
+
+        const response = await fetch(`/employee/update_task/${taskId}`, {
+            method: 'POST',
+            body: formData
+        });
+
+        if (response.ok) {
+            const checkbox = document.getElementById(`check-${taskId}`);
+            if (newStatus === 'completada') {
+                checkbox.classList.add('completed');
+                checkbox.innerHTML = '✓';
+            }
+
+            // Reload page to update stats
+            setTimeout(() => location.reload(), 500);
+        }
+    } catch (error) {
+        console.error('Error updating task:', error);
+    }
+}
+
+function updateTaskStatusFromBtn(btn) {
+    const taskId = btn.getAttribute('data-id');
+    const currentStatus = btn.getAttribute('data-status');
+    updateTaskStatus(taskId, currentStatus);
+}
+
+function logout() {
+    if (confirm('¿Cerrar sesión?')) {
+        window.location.href = LOGOUT_URL;
+    }
+}
+// Auto-hide flash messages
+setTimeout(() => {
+    const flashMessages = document.querySelectorAll('.flash-message');
+    flashMessages.forEach(msg => {
+        msg.style.animation = 'slideOutRight 0.4s ease forwards';
+        setTimeout(() => msg.remove(), 400);
+    });
+}, 5000);
+// Initialize progress bars
+document.querySelectorAll('.progress-fill').forEach(fill => {
+    const progress = fill.getAttribute('data-progress');
+    if (progress) {
+        fill.style.width = progress + '%';
+    }
+});
@@ -0,0 +1,83 @@
+"""
+Servicio de estadísticas agregadas para el dashboard de administración.
+
+Todos los contadores se calculan en una sola ida y vuelta a la base de datos
+(agregados condicionales y subconsultas escalares) y se guardan en memoria
+durante STATS_TTL segundos. Las rutas que modifican datos llaman a
+`invalidate_admin_stats()` para que el siguiente acceso los recalcule.
+
+La caché es de cada proceso: una escritura en otro worker de gunicorn o en el
+proceso de trabajos (`flask jobs work`) no la invalida aquí, así que los
+recuentos pueden ir hasta STATS_TTL segundos por detrás.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import case, func, select
+
+from models import db, User, Task, Project, SupportTicket
+
+STATS_TTL = int(os.environ.get('STATS_TTL', '30'))
+
+EMPTY_STATS = {
+    'total_users': 0,
+    'total_admins': 0,
+    'total_employees': 0,
+    'total_clients': 0,
+    'total_tasks': 0,
+    'active_tasks': 0,
+    'total_projects': 0,
+    'total_tickets': 0,
+}
+
+_cache = {'value': None, 'expires': 0.0}
+_lock = threading.Lock()
+
+
+def _role_count(role):
+    return func.coalesce(func.sum(case((User.role == role, 1), else_=0)), 0)
+
+
+def compute_admin_stats():
+    """Calcula todos los contadores del dashboard en una única consulta."""
+    total_tasks = select(func.count(Task.id)).scalar_subquery()
+    active_tasks = select(func.count(Task.id)).where(Task.status != 'completada').scalar_subquery()
+    total_projects = select(func.count(Project.id)).scalar_subquery()
+    open_tickets = select(func.count(SupportTicket.id)).where(SupportTicket.status != 'resuelto').scalar_subquery()
+
+    row = db.session.execute(
+        select(
+            func.count(User.id).label('total_users'),
+            _role_count('admin').label('total_admins'),
+            _role_count('empleado').label('total_employees'),
+            _role_count('cliente').label('total_clients'),
+            total_tasks.label('total_tasks'),
+            active_tasks.label('active_tasks'),
+            total_projects.label('total_projects'),
+            open_tickets.label('total_tickets'),
+        ).select_from(User)
+    ).one()
+    return {key: int(value or 0) for key, value in row._mapping.items()}
+
+
+def get_admin_stats():
+    """Devuelve las estadísticas cacheadas, recalculándolas al expirar el TTL."""
+    now = time.monotonic()
+    cached = _cache['value']
+    if cached is not None and now < _cache['expires']:
+        return cached
+    with _lock:
+        if _cache['value'] is not None and time.monotonic() < _cache['expires']:
+            return _cache['value']
+        value = compute_admin_stats()
+        _cache['value'] = value
+        _cache['expires'] = time.monotonic() + STATS_TTL
+        return value
+
+
+def invalidate_admin_stats():
+    """Descarta las estadísticas cacheadas tras una escritura."""
+    with _lock:
+        _cache['value'] = None
+        _cache['expires'] = 0.0
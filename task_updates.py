@@ -0,0 +1,79 @@
+"""
+Actualización de estado de tareas en lote.
+
+Una petición con N cambios se resuelve con una consulta de propiedad
+(`WHERE id IN (...) AND assigned_to = :me`), un único UPDATE con CASE por id y
+un solo commit, en lugar de N lecturas, N comprobaciones y N commits.
+"""
+import os
+from datetime import datetime
+
+from sqlalchemy import case, update
+
+from dashboard_data import TASK_STATUSES
+from models import db, Task
+
+TASK_BATCH_MAX = int(os.environ.get('TASK_BATCH_MAX', '500'))
+
+
+class BatchError(ValueError):
+    """Lote mal formado: se rechaza entero sin tocar la base de datos."""
+
+
+def parse_changes(payload):
+    """Valida `{"updates": [{"id": 1, "status": "completada"}, ...]}` y devuelve [(id, estado)]."""
+    updates = payload.get('updates') if isinstance(payload, dict) else None
+    if not isinstance(updates, list) or not updates:
+        raise BatchError('Se esperaba una lista "updates" no vacía')
+    if len(updates) > TASK_BATCH_MAX:
+        raise BatchError(f'Máximo {TASK_BATCH_MAX} cambios por lote')
+    changes = []
+    for item in updates:
+        try:
+            changes.append((int(item['id']), item.get('status')))
+        except (TypeError, KeyError, ValueError):
+            raise BatchError('Cada cambio necesita un "id" entero y un "status"')
+    return changes
+
+
+def apply_task_statuses(user_id, changes):
+    """
+    Aplica los cambios válidos sobre las tareas del usuario y devuelve un
+    resultado por elemento, en el orden recibido. Si un id se repite, gana el
+    último cambio.
+    """
+    requested = {task_id: status for task_id, status in changes if status in TASK_STATUSES}
+    owned = set()
+    if requested:
+        owned = set(db.session.execute(
+            db.select(Task.id).where(Task.id.in_(requested), Task.assigned_to == user_id)
+        ).scalars())
+
+    to_apply = {task_id: status for task_id, status in requested.items() if task_id in owned}
+    if to_apply:
+        now = datetime.utcnow()
+        completed = [task_id for task_id, status in to_apply.items() if status == 'completada']
+        db.session.execute(
+            update(Task)
+            .where(Task.id.in_(to_apply), Task.assigned_to == user_id)
+            .values(
+                status=case(to_apply, value=Task.id),
+                completed_at=case((Task.id.in_(completed), now), else_=Task.completed_at),
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    results = []
+    for task_id, status in changes:
+        if status not in TASK_STATUSES:
+            results.append({'id': task_id, 'ok': False, 'error': 'Estado no válido'})
+        elif task_id not in owned:
+            # No se distingue "no existe" de "no es tuya" para no revelar tareas ajenas
+            results.append({'id': task_id, 'ok': False, 'error': 'Tarea no encontrada'})
+        elif requested[task_id] != status:
+            results.append({'id': task_id, 'ok': False, 'error': 'Sustituido por un cambio posterior'})
+        else:
+            results.append({'id': task_id, 'ok': True, 'status': status})
+    return results, len(to_apply)
@@ -0,0 +1,48 @@
+"""
+Caché de bytecode de Jinja en disco y precompilación de plantillas.
+
+Compilar los paneles (cientos de líneas de Jinja) cuesta decenas de
+milisegundos. Sin caché, cada worker de gunicorn lo pagaba en la primera
+petición a cada panel, y otra vez tras cada reciclado (max_requests) o
+reinicio.
+
+- `FileSystemBytecodeCache` en JINJA_CACHE_DIR guarda el código compilado.
+  La clave incluye el checksum del fuente, así que una plantilla modificada
+  en un despliegue se recompila sola. Jinja escribe en un temporal y lo
+  renombra, de modo que varios procesos pueden compartir el directorio.
+- `warm_templates` carga todas las plantillas al importar la aplicación. Con
+  `gunicorn --preload` eso ocurre una vez en el maestro y los workers heredan
+  las plantillas ya compiladas, también los que se crean al reciclar.
+
+JINJA_CACHE_DIR vacío desactiva la caché en disco.
+"""
+import os
+import tempfile
+
+from jinja2 import FileSystemBytecodeCache
+
+JINJA_CACHE_DIR = os.environ.get('JINJA_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'jinja_bytecode'))
+
+
+def warm_templates(app):
+    """Compila todas las plantillas en la caché del entorno; devuelve cuántas."""
+    env = app.jinja_env
+    names = env.list_templates(extensions=('html',))
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def init_template_cache(app, cache_dir=JINJA_CACHE_DIR):
+    """Activa la caché de bytecode y precompila las plantillas."""
+    if cache_dir:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        except OSError as e:
+            app.logger.warning(f"Caché de bytecode de Jinja desactivada ({cache_dir}): {str(e)}")
+    try:
+        warm_templates(app)
+    except Exception as e:
+        # Un error de sintaxis debe verse al renderizar, no impedir el arranque
+        app.logger.error(f"Error al precompilar plantillas: {str(e)}")
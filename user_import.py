@@ -0,0 +1,214 @@
+"""
+Alta masiva de usuarios desde CSV o JSON.
+
+El fichero se lee como flujo (CSV con cabecera, NDJSON o un array JSON) y se
+procesa por lotes de IMPORT_BATCH_SIZE filas:
+
+1. Validación por fila (usuario, rol, email) y duplicados dentro del fichero.
+2. Duplicados contra la base de datos con una sola consulta `IN` por lote.
+3. Hash de las contraseñas del lote en paralelo, con un pool de procesos que se
+   crea una vez por importación (`hasher.bulk()`).
+4. Inserción del lote con executemany y un commit.
+
+Las filas sin contraseña se crean con un hash inutilizable: la cuenta existe
+pero no puede iniciar sesión hasta que un administrador le asigne una. Sin
+KDF de por medio, 50k usuarios se importan en segundos; con contraseñas en
+claro el tiempo lo marca el coste del KDF dividido entre las CPUs.
+"""
+import codecs
+import csv
+import io
+import json
+import os
+
+from email_validator import EmailNotValidError, validate_email
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User
+from passwords import hasher
+
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '1000'))
+IMPORT_MAX_ROWS = int(os.environ.get('IMPORT_MAX_ROWS', '50000'))
+IMPORT_MAX_ERRORS = 1000
+
+ROLES = ('admin', 'empleado', 'cliente')
+UNUSABLE_PASSWORD = '!'  # check_password_hash nunca acepta un hash sin '$'
+USERNAME_MAX_LENGTH = User.__table__.c.username.type.length
+EMAIL_MAX_LENGTH = User.__table__.c.email.type.length
+
+
+class ImportFormatError(ValueError):
+    """El fichero no se puede leer en el formato indicado."""
+
+
+_NOT_UTF8 = 'El fichero no está codificado en UTF-8'
+
+
+def iter_records(stream, filename):
+    """Genera (línea, dict) desde un fichero CSV, NDJSON o JSON sin cargarlo entero si es posible."""
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        reader = csv.DictReader(text)
+        try:
+            for record in reader:
+                yield reader.line_num, record
+        except UnicodeDecodeError:
+            raise ImportFormatError(_NOT_UTF8)
+        except csv.Error as e:
+            raise ImportFormatError(f'CSV mal formado tras la línea {reader.line_num}: {e}')
+    elif name.endswith(('.ndjson', '.jsonl')):
+        try:
+            for number, line in enumerate(codecs.getreader('utf-8-sig')(stream), start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield number, json.loads(line)
+                except json.JSONDecodeError:
+                    yield number, None
+        except UnicodeDecodeError:
+            raise ImportFormatError(_NOT_UTF8)
+    elif name.endswith('.json'):
+        try:
+            records = json.load(codecs.getreader('utf-8-sig')(stream))
+        except UnicodeDecodeError:
+            raise ImportFormatError(_NOT_UTF8)
+        except json.JSONDecodeError as e:
+            raise ImportFormatError(f'JSON no válido: {e}')
+        if not isinstance(records, list):
+            raise ImportFormatError('El JSON debe ser una lista de usuarios')
+        yield from enumerate(records, start=1)
+    else:
+        raise ImportFormatError('Formato no soportado (usa .csv, .ndjson o .json)')
+
+
+def validate_record(record):
+    """Normaliza una fila; devuelve (datos, None) o (None, mensaje de error)."""
+    if not isinstance(record, dict):
+        return None, 'Fila mal formada'
+    username = str(record.get('username') or '').strip()
+    role = str(record.get('role') or '').strip()
+    email = str(record.get('email') or '').strip()
+    password = record.get('password') or None
+    if not username:
+        return None, 'Falta el nombre de usuario'
+    if len(username) > USERNAME_MAX_LENGTH:
+        return None, f'El nombre de usuario supera {USERNAME_MAX_LENGTH} caracteres'
+    if role not in ROLES:
+        return None, f'Rol no válido: {role or "(vacío)"}'
+    if email:
+        if len(email) > EMAIL_MAX_LENGTH:
+            return None, f'El email supera {EMAIL_MAX_LENGTH} caracteres'
+        try:
+            # Sin consulta DNS: miles de filas no pueden esperar a un resolver
+            email = validate_email(email, check_deliverability=False).normalized
+        except EmailNotValidError as e:
+            return None, f'Email no válido: {str(e)}'
+    if password is not None and not isinstance(password, str):
+        return None, 'La contraseña debe ser texto'
+    return {'username': username, 'role': role, 'email': email, 'password': password}, None
+
+
+class ImportReport:
+    """Resumen de la importación con los errores por fila."""
+
+    def __init__(self):
+        self.total = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def error(self, line, username, message):
+        self.error_count += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({'line': line, 'username': username, 'error': message})
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'created': self.created,
+            'failed': self.error_count,
+            'errors': sorted(self.errors, key=lambda e: e['line'] or 0),
+            'errors_truncated': self.error_count > len(self.errors),
+        }
+
+
+def _existing_usernames(usernames):
+    return set(db.session.execute(
+        db.select(User.username).where(User.username.in_(usernames))
+    ).scalars())
+
+
+def _insert_batch(batch, report, bulk):
+    """Descarta duplicados en BD, hashea en paralelo e inserta el lote con un commit."""
+    existing = _existing_usernames([row['username'] for _, row in batch])
+    pending = []
+    for line, row in batch:
+        if row['username'] in existing:
+            report.error(line, row['username'], 'El nombre de usuario ya existe')
+        else:
+            pending.append((line, row))
+    if not pending:
+        return
+
+    with_password = [row['password'] for _, row in pending if row['password']]
+    hashes = iter(bulk.hash_many(with_password))
+    values = [{
+        'username': row['username'],
+        'role': row['role'],
+        'email': row['email'],
+        'password_hash': next(hashes) if row['password'] else UNUSABLE_PASSWORD,
+    } for _, row in pending]
+
+    try:
+        db.session.execute(insert(User), values)
+        db.session.commit()
+    except IntegrityError:
+        # Otro administrador creó alguno de estos usuarios entre la comprobación y el INSERT
+        db.session.rollback()
+        existing = _existing_usernames([v['username'] for v in values])
+        retry = [v for v in values if v['username'] not in existing]
+        for line, row in pending:
+            if row['username'] in existing:
+                report.error(line, row['username'], 'El nombre de usuario ya existe')
+        if retry:
+            db.session.execute(insert(User), retry)
+            db.session.commit()
+        values = retry
+    report.created += len(values)
+
+
+def import_users(stream, filename, batch_size=IMPORT_BATCH_SIZE, max_rows=IMPORT_MAX_ROWS):
+    """Importa usuarios desde un flujo y devuelve el ImportReport."""
+    report = ImportReport()
+    seen = set()
+    batch = []
+    with hasher.bulk() as bulk:
+        try:
+            for line, record in iter_records(stream, filename):
+                report.total += 1
+                if report.total > max_rows:
+                    report.total -= 1
+                    report.error(line, None, f'Se superó el máximo de {max_rows} filas; el resto no se procesó')
+                    break
+                row, error = validate_record(record)
+                if error:
+                    report.error(line, record.get('username') if isinstance(record, dict) else None, error)
+                    continue
+                if row['username'] in seen:
+                    report.error(line, row['username'], 'Usuario repetido en el fichero')
+                    continue
+                seen.add(row['username'])
+                batch.append((line, row))
+                if len(batch) >= batch_size:
+                    _insert_batch(batch, report, bulk)
+                    batch = []
+        except ImportFormatError as e:
+            if report.created:
+                # Los lotes anteriores ya están confirmados: que el mensaje lo diga
+                raise ImportFormatError(f'{e}; ya se habían importado {report.created} usuarios')
+            raise
+        if batch:
+            _insert_batch(batch, report, bulk)
+    return report
@@ -0,0 +1,94 @@
+"""
+Presupuesto de consultas SQL por ruta.
+
+Crea una base SQLite temporal con los datos de ejemplo de init_db.py, inicia
+sesión con cada rol mediante el test_client de Flask y ejecuta cada ruta
+dentro de `instrumentation.query_budget`. Termina con código 1 si alguna ruta
+supera su presupuesto: una consulta N+1 nueva aparece aquí antes que en
+producción.
+
+Uso:
+    python verify_query_budgets.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix='query_budgets_')
+os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(_db_dir, 'budgets.db')}"
+os.environ.setdefault('RATELIMIT_ENABLED', '0')
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+os.environ.setdefault('INSTRUMENTATION_SAMPLE_RATE', '0')
+os.environ.setdefault('JINJA_CACHE_DIR', '')
+
+from app import app  # noqa: E402
+from init_db import init_db  # noqa: E402
+from instrumentation import query_budget  # noqa: E402
+
+CREDENTIALS = {
+    'admin': ('admin', 'admin123'),
+    'empleado': ('empleado1', 'emp123'),
+    'cliente': ('cliente1', 'cli123'),
+}
+
+# (rol, ruta, consultas máximas). Las rutas se piden en este orden dentro de
+# la sesión de cada rol, así que /client se mide primero en frío y luego desde
+# la caché de resúmenes.
+BUDGETS = [
+    ('admin', '/admin', 2),
+    ('admin', '/admin/search?q=cli', 1),
+    ('admin', '/admin/jobs', 1),
+    ('admin', '/admin/deletions', 1),
+    ('empleado', '/employee', 3),
+    ('empleado', '/employee/tasks', 2),
+    ('cliente', '/client', 2),
+    ('cliente', '/client', 0),
+    ('cliente', '/client/my_projects', 2),
+    ('cliente', '/client/my_tickets', 2),
+    ('cliente', '/client/notes', 1),
+]
+
+
+def login(role):
+    client = app.test_client()
+    username, password = CREDENTIALS[role]
+    response = client.post('/login', data={'username': username, 'password': password})
+    if response.status_code != 302:
+        raise RuntimeError(f'No se pudo iniciar sesión como {role} (HTTP {response.status_code})')
+    # La primera petición carga la identidad en la caché del worker
+    client.get('/')
+    return client
+
+
+def check_budgets():
+    failures = 0
+    clients = {}
+    for role, path, budget in BUDGETS:
+        if role not in clients:
+            clients[role] = login(role)
+        try:
+            with query_budget(budget) as counter:
+                response = clients[role].get(path)
+        except AssertionError as e:
+            failures += 1
+            print(f"[FAIL] {path} ({role}): {e}")
+            continue
+        if response.status_code != 200:
+            failures += 1
+            print(f"[FAIL] {path} ({role}): HTTP {response.status_code}")
+            continue
+        print(f"[OK] {path} ({role}): {counter['queries']}/{budget} consultas")
+    return failures
+
+
+if __name__ == "__main__":
+    print("Verificando presupuestos de consultas...")
+    app.config['WTF_CSRF_ENABLED'] = False
+    try:
+        init_db()
+        failed = check_budgets()
+    finally:
+        shutil.rmtree(_db_dir, ignore_errors=True)
+    print(f"\n{'✗' if failed else '✓'} {len(BUDGETS) - failed}/{len(BUDGETS)} rutas dentro de presupuesto")
+    sys.exit(1 if failed else 0)